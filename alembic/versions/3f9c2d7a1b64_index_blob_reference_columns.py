@@ -0,0 +1,41 @@
+"""index blob reference columns
+
+Revision ID: 3f9c2d7a1b64
+Revises: 85a58a515e4a
+Create Date: 2026-10-17 08:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2d7a1b64'
+down_revision: Union[str, None] = '85a58a515e4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columns the blob collector looks blob URLs up in (blob_gc_service.REFERENCE_COLUMNS)
+REFERENCE_COLUMNS = [
+    ('posts', 'media_url'),
+    ('stories', 'media_url'),
+    ('users', 'profile_picture_url'),
+    ('pets', 'profile_picture_url'),
+    ('complaints', 'evidence_url'),
+    ('messages', 'media_url'),
+    ('animal_types', 'image_url'),
+    ('pet_types', 'image_url'),
+    ('breeds', 'image_url'),
+]
+
+
+def upgrade() -> None:
+    for table, column in REFERENCE_COLUMNS:
+        op.create_index(op.f(f'ix_{table}_{column}'), table, [column], unique=False)
+
+
+def downgrade() -> None:
+    for table, column in reversed(REFERENCE_COLUMNS):
+        op.drop_index(op.f(f'ix_{table}_{column}'), table_name=table)
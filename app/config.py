@@ -1,3 +1,5 @@
+import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Setting(BaseSettings):
@@ -6,13 +8,103 @@ class Setting(BaseSettings):
     database_password: str
     database_name: str
     database_username: str
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_timeout: int = 30      # seconds to wait for a free connection
+    database_pool_recycle: int = 1800    # seconds; keep below Azure's idle timeout
+    database_pool_pre_ping: bool = True
+    # Optional streaming replica for GET requests; falls back to the primary when unset
+    database_replica_hostname: Optional[str] = None
+    database_replica_port: Optional[str] = None
+    read_your_writes_seconds: int = 5    # keep a user's reads on the primary after a write
+    # Per-request query logging: warn above this many queries, or when one statement repeats this often (N+1)
+    query_count_warn_threshold: int = 30
+    query_repeat_warn_threshold: int = 5
+
+    # Opt-in slow query log with sampled EXPLAIN (ANALYZE, BUFFERS) plans
+    slow_query_log_enabled: bool = False
+    slow_query_threshold_ms: int = 200
+    slow_query_explain_sample_rate: float = 0.1
+    slow_query_log_path: str = "logs/slow_queries.log"
+    slow_query_log_max_bytes: int = 10 * 1024 * 1024
+    slow_query_log_backup_count: int = 5
+
+    # Tracing: exporter is one of tracing_service's registered exporters ("console", "file", ...)
+    tracing_enabled: bool = False
+    tracing_exporter: str = "console"
+    tracing_file_path: str = "logs/traces.jsonl"
+    tracing_service_name: str = "ammury-api"
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int
+    refresh_token_expire_days: int = 30
+    token_revocation_refresh_seconds: int = 30   # how often each worker reloads the revocation list
+    # Per-worker cache of the authenticated user's row, see oauth2.get_current_user
+    user_cache_ttl_seconds: int = 60
+    user_cache_max_size: int = 10000
+    # bcrypt runs on its own bounded executor; logins beyond workers + queue get a 503
+    bcrypt_rounds: int = 12              # changing this rehashes passwords on the next login
+    password_hash_workers: int = 4
+    password_hash_max_queue: int = 64
+    # Token-bucket rate limits, policies live in services/rate_limit_service.py
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"   # "memory" (per worker) or "redis" (shared)
+    rate_limit_redis_url: Optional[str] = None
+    # Behind a reverse proxy request.client is the proxy, so every caller would share one "ip" bucket:
+    # take the address the proxy appended to X-Forwarded-For instead. On by default under Azure App
+    # Service (which sets WEBSITE_SITE_NAME and whose front end appends to the header); elsewhere
+    # only turn it on behind a proxy that does the same, or clients can pick their own address
+    rate_limit_trust_forwarded_for: bool = "WEBSITE_SITE_NAME" in os.environ
+    rate_limit_forwarded_for_hops: int = 1   # trusted proxies appending to X-Forwarded-For
+
+    # Media storage: "azure", "local" (files under storage_local_path) or "memory" (per process).
+    # local and memory blobs are served by the API under storage_base_url (routers/storage.py);
+    # storage_latency_ms is added to each of their operations to mimic a remote store
+    storage_backend: str = "azure"
+    storage_local_path: str = "storage"
+    storage_base_url: str = "http://localhost:8000/storage"
+    storage_latency_ms: float = 0
 
-    azure_storage_connection_string: str
-    azure_storage_account_key: str
-    azure_storage_container_name: str
+    # Required for the azure storage backend only
+    azure_storage_connection_string: Optional[str] = None
+    azure_storage_account_key: Optional[str] = None
+    azure_storage_container_name: Optional[str] = None
+    azure_storage_max_connections: int = 100     # connection pool of the async blob client
+    # Uploads above the threshold are staged as blocks, at most max_concurrency in flight,
+    # so one upload holds at most block_size * max_concurrency bytes in memory
+    blob_block_upload_threshold: int = 8 * 1024 * 1024
+    blob_upload_block_size: int = 4 * 1024 * 1024
+    blob_upload_max_concurrency: int = 4
+    # Direct-to-storage uploads: lifetime of the write SAS, and largest blob accepted at finalize
+    direct_upload_sas_minutes: int = 15
+    direct_upload_max_bytes: int = 200 * 1024 * 1024
+    # Uploaded files are checked while streaming in: size caps per endpoint, type by magic bytes
+    upload_validation_enabled: bool = True
+    upload_max_post_bytes: int = 200 * 1024 * 1024
+    upload_max_story_bytes: int = 200 * 1024 * 1024
+    upload_max_profile_picture_bytes: int = 10 * 1024 * 1024
+    upload_max_complaint_bytes: int = 25 * 1024 * 1024
+    # Resized variants of uploaded images (sizes in services/image_service.py)
+    image_processing_workers: int = 2
+    image_variant_format: str = "WEBP"      # or "JPEG" for clients without WebP support
+    image_variant_quality: int = 80
+    image_variant_max_source_bytes: int = 25 * 1024 * 1024
+    # Blob garbage collection (services/blob_gc_service.py): the queue is drained every interval,
+    # user-data/ is swept for unreferenced blobs older than min_age every sweep interval (0 disables)
+    blob_gc_enabled: bool = True
+    blob_gc_interval_seconds: int = 60
+    blob_gc_batch_size: int = 256           # capped at the backend's batch delete limit (256 on Azure)
+    blob_gc_max_attempts: int = 5
+    blob_gc_sweep_interval_hours: float = 24
+    blob_gc_min_age_hours: float = 24
+    # Read SAS shared by all URLs; replaced once it is within the rotation margin of expiry
+    sas_token_lifetime_minutes: int = 1440
+    sas_token_rotation_margin_minutes: int = 60
+    # Public-read container for reference images (animal types, pet types, breeds), served unsigned.
+    # Unset: reference images stay in the private container and are signed like user content
+    azure_storage_public_container_name: Optional[str] = None
+    public_media_base_url: Optional[str] = None      # CDN endpoint in front of the public container
+    reference_media_cache_control: str = "public, max-age=31536000, immutable"
 
     email_sender: str
     email_password: str
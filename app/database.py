@@ -1,24 +1,86 @@
+from fastapi import Request
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import settings
+from .utils.pool_metrics import InstrumentedQueuePool, InstrumentedAsyncAdaptedQueuePool, attach_pool_metrics
+from .utils.read_routing import ReadYourWritesTracker
 
 
 SQLALCHEMY_DATABASE_URL = f'postgresql://{settings.database_username}:{settings.database_password}' \
                          f'@{settings.database_hostname}:{settings.database_port}/{settings.database_name}'
 
+# Same database through asyncpg, used by handlers that must not block the event loop
+ASYNC_SQLALCHEMY_DATABASE_URL = f'postgresql+asyncpg://{settings.database_username}:{settings.database_password}' \
+                               f'@{settings.database_hostname}:{settings.database_port}/{settings.database_name}'
 
+REPLICA_HOSTNAME = settings.database_replica_hostname
+REPLICA_PORT = settings.database_replica_port or settings.database_port
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+
+POOL_OPTIONS = dict(
+    pool_size=settings.database_pool_size,
+    max_overflow=settings.database_max_overflow,
+    pool_timeout=settings.database_pool_timeout,
+    pool_recycle=settings.database_pool_recycle,
+    pool_pre_ping=settings.database_pool_pre_ping,
+)
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=InstrumentedQueuePool, **POOL_OPTIONS)
+attach_pool_metrics(engine, "primary")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=InstrumentedAsyncAdaptedQueuePool, **POOL_OPTIONS)
+attach_pool_metrics(async_engine.sync_engine, "primary_async")
+
+# expire_on_commit=False: attributes can't be lazily refreshed on an AsyncSession,
+# so objects must stay readable after commit while the response is serialized
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+if REPLICA_HOSTNAME:
+    replica_engine = create_engine(
+        f'postgresql://{settings.database_username}:{settings.database_password}'
+        f'@{REPLICA_HOSTNAME}:{REPLICA_PORT}/{settings.database_name}',
+        poolclass=InstrumentedQueuePool, **POOL_OPTIONS
+    )
+    attach_pool_metrics(replica_engine, "replica")
+
+    async_replica_engine = create_async_engine(
+        f'postgresql+asyncpg://{settings.database_username}:{settings.database_password}'
+        f'@{REPLICA_HOSTNAME}:{REPLICA_PORT}/{settings.database_name}',
+        poolclass=InstrumentedAsyncAdaptedQueuePool, **POOL_OPTIONS
+    )
+    attach_pool_metrics(async_replica_engine.sync_engine, "replica_async")
+else:
+    # No replica configured: route "replica" sessions to the primary so the code path stays the same
+    replica_engine = engine
+    async_replica_engine = async_engine
+
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+AsyncReplicaSessionLocal = async_sessionmaker(bind=async_replica_engine, autoflush=False, expire_on_commit=False)
+
+read_your_writes = ReadYourWritesTracker(settings.read_your_writes_seconds)
+
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
+def get_db(request: Request):
+    """
+    Replica session for read-only requests, primary session for writes
+    and for users still inside their read-your-writes window.
+    """
+    session_factory = ReplicaSessionLocal if read_your_writes.use_replica(request) else SessionLocal
+    db = session_factory()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(request: Request):
+    session_factory = AsyncReplicaSessionLocal if read_your_writes.use_replica(request) else AsyncSessionLocal
+    async with session_factory() as db:
+        yield db
@@ -1,16 +1,65 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
-from  . import models
+from  . import models, oauth2
 from .database import engine
-from .routers import like, post, user, auth, pet, comment, notification, story, follow, dropdown, messaging, complaints
+from .utils.pool_metrics import get_pool_stats
+from .utils.query_counter import query_counter_middleware
+from .utils.slow_query_log import enable_slow_query_log
+from .utils.upload_guard import UploadGuardMiddleware
+from .config import settings
+from .services.metrics_service import metrics_middleware, metrics_response
+from .services import blob_gc_service, image_service, rate_limit_service, storage_service, upload_policy_service
+from .services.storage_service import signing_context_middleware
+from .services.tracing_service import setup_tracing, tracing_middleware
+from .routers import like, post, user, auth, pet, comment, notification, story, follow, dropdown, messaging, complaints, upload, storage
 
 # models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+if settings.slow_query_log_enabled:
+    enable_slow_query_log()
+
+if settings.tracing_enabled:
+    setup_tracing()
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await run_in_threadpool(oauth2.load_revoked_tokens)
+    except Exception as e:
+        logger.error(f"Could not load revoked tokens at startup: {e}")
+    revocation_refresher = asyncio.create_task(oauth2.keep_revocations_fresh())
+    await storage_service.start_storage()
+    image_service.start_image_pool()
+    blob_collector = asyncio.create_task(blob_gc_service.keep_collecting()) if settings.blob_gc_enabled else None
+
+    yield
+
+    revocation_refresher.cancel()
+    if blob_collector is not None:
+        blob_collector.cancel()
+    await storage_service.close_storage()
+    image_service.stop_image_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = ["*"]
 
+# Innermost, so its 413/415 responses still get CORS headers and show up in the metrics
+app.add_middleware(UploadGuardMiddleware, resolve=upload_policy_service.resolve,
+                   on_reject=upload_policy_service.record_rejection)
+# Outside the upload guard, so throttled uploads are refused before any of the body is read
+app.middleware("http")(rate_limit_service.rate_limit_middleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -19,6 +68,13 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# Registered before the query counter so it runs inside it and can read the request's query stats
+app.middleware("http")(metrics_middleware)
+app.middleware("http")(query_counter_middleware)
+app.middleware("http")(signing_context_middleware)
+if settings.tracing_enabled:
+    app.middleware("http")(tracing_middleware)
+
 app.include_router(post.router)
 app.include_router(user.router)
 app.include_router(auth.router)
@@ -31,9 +87,27 @@ app.include_router(follow.router)
 app.include_router(dropdown.router)
 app.include_router(messaging.router)
 app.include_router(complaints.router)
+app.include_router(upload.router)
+app.include_router(storage.router)
 
 
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
+
+
+@app.get("/health/db-pool")
+def db_pool_stats():
+    """
+    Checked-out, overflow and checkout wait-time counters for every database pool in this worker.
+    """
+    return get_pool_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Prometheus scrape endpoint.
+    """
+    return metrics_response()
    
\ No newline at end of file
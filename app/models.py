@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, SmallInteger, Numeric, Date, String, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, Numeric, Date, String, Text, Boolean, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.expression import text
 from sqlalchemy.sql.sqltypes import TIMESTAMP
@@ -14,7 +15,8 @@ class Post(Base):
     pet_id = Column(Integer, ForeignKey("pets.id", ondelete="SET NULL"), nullable=True)
     title = Column(String, nullable=True)
     content = Column(Text, nullable=True)
-    media_url = Column(String, nullable=False)
+    media_url = Column(String, nullable=False, index=True)
+    media_variants = Column(JSONB, nullable=True)      # {variant: url}, see image_service
     media_type = Column(String, nullable=True)
     visibility = Column(String, nullable=False, server_default="public")
     is_active = Column(Boolean, nullable=False, server_default="TRUE", comment="Indicates if the post is active")
@@ -45,7 +47,8 @@ class User(Base):
     email = Column(String, unique=True, nullable=False)
     phone = Column(String, unique=True, nullable=True)
     password = Column(String, nullable=False)
-    profile_picture_url = Column(String)
+    profile_picture_url = Column(String, index=True)
+    profile_picture_variants = Column(JSONB, nullable=True)
     bio = Column(Text)
     location = Column(String)
     date_of_birth = Column(Date)
@@ -115,7 +118,7 @@ class AnimalType(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
-    image_url = Column(String, nullable=True)
+    image_url = Column(String, nullable=True, index=True)
 
     # One-to-Many relationship with PetType
     pet_types = relationship("PetType", back_populates="animal_type")
@@ -127,7 +130,7 @@ class PetType(Base):
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
-    image_url = Column(String, nullable=True)
+    image_url = Column(String, nullable=True, index=True)
     animal_type_id = Column(Integer, ForeignKey('animal_types.id'), nullable=False)
 
     # Many-to-One relationship
@@ -143,7 +146,7 @@ class Breed(Base):
     
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
-    image_url = Column(String, nullable=True)
+    image_url = Column(String, nullable=True, index=True)
     pet_type_id = Column(Integer, ForeignKey('pet_types.id'), nullable=False)
 
     pet_type = relationship("PetType", back_populates="breeds")
@@ -239,7 +242,8 @@ class Pet(Base):
     breed_1_id = Column(Integer, ForeignKey('breeds.id'), nullable=False)            # Breed of the pet (e.g., Persian, Beagle)
     breed_2_id = Column(Integer, ForeignKey('breeds.id'))                            # Breed of the pet (e.g., Persian, Beagle)
     gender = Column(String(1))    # 'M' for male, 'F' for female, 'O' for other
-    profile_picture_url = Column(String)
+    profile_picture_url = Column(String, index=True)
+    profile_picture_variants = Column(JSONB, nullable=True)
     bio = Column(Text)
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
     date_of_birth = Column(Date)
@@ -281,7 +285,8 @@ class Story(Base):
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     pet_id = Column(Integer, ForeignKey("pets.id", ondelete="CASCADE"), nullable=False)
-    media_url = Column(String, nullable=True)
+    media_url = Column(String, nullable=True, index=True)
+    media_variants = Column(JSONB, nullable=True)      # {variant: url}, see image_service
     media_type = Column(String, nullable=True)
     content = Column(Text, nullable=True)
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text("CURRENT_TIMESTAMP"))
@@ -326,7 +331,7 @@ class Message(Base):
     conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
     sender_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     content = Column(Text)
-    media_url = Column(String)
+    media_url = Column(String, index=True)
     media_type = Column(String(30))  # image/video/audio/document
     created_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'))
     
@@ -355,7 +360,69 @@ class Complaint(Base):
     entity_type = Column(String, nullable=False)  # e.g., 'user', 'pet', 'post', 'story'
     entity_id = Column(Integer, nullable=False)
     reason = Column(String, nullable=False)
-    evidence_url = Column(String, nullable=True)
+    evidence_url = Column(String, nullable=True, index=True)
     created_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'))
 
     complainer = relationship("User", foreign_keys=[complainer_id])
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String, primary_key=True)  # JWT ID of the revoked access or refresh token
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)
+    token_type = Column(String, nullable=False, server_default='access')  # only access tokens are cached in memory
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False, index=True)  # purged after this (oauth2.purge_revoked_tokens)
+    revoked_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'), index=True)
+
+
+class MediaBlob(Base):
+    """
+    Content-hash index of uploaded media, so identical uploads share one blob.
+    ref_count is the number of records (posts, stories, profile pictures, ...) using it.
+    """
+    __tablename__ = "media_blobs"
+
+    content_hash = Column(String(64), primary_key=True)  # sha256 hex of the file bytes
+    blob_url = Column(String, nullable=False, unique=True)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String, nullable=True)
+    variants = Column(JSONB, nullable=True)
+    ref_count = Column(Integer, nullable=False, server_default="0")
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+
+
+class BlobDeletion(Base):
+    """
+    Blobs waiting to be deleted by the background collector, see services/blob_gc_service.py.
+    """
+    __tablename__ = "blob_deletions"
+
+    id = Column(BigInteger, primary_key=True)
+    blob_url = Column(String, nullable=False, unique=True)
+    attempts = Column(Integer, nullable=False, server_default="0")
+    last_error = Column(String, nullable=True)
+    enqueued_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    # Claimed entries and failed ones wait until then before the next attempt
+    next_attempt_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'), index=True)
+
+
+class JobRun(Base):
+    """
+    When a periodic background job last completed, shared by all workers.
+    """
+    __tablename__ = "job_runs"
+
+    name = Column(String, primary_key=True)
+    last_run_at = Column(TIMESTAMP(timezone=True), nullable=False)
+
+
+class ConsumedUpload(Base):
+    """
+    Direct uploads already attached to a record, so their upload token can't be used twice.
+    """
+    __tablename__ = "consumed_uploads"
+
+    blob_name = Column(String, primary_key=True)
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False, index=True)  # rows can be purged after this
+    consumed_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
@@ -1,12 +1,23 @@
+import asyncio
+import logging
+import uuid
 from typing import Optional
 from jose import JWTError, jwt
 from datetime import datetime, timedelta, timezone
-from sqlalchemy.orm import Session
-from fastapi import Depends, status, HTTPException
+from sqlalchemy import inspect
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, make_transient_to_detached
+from fastapi import Depends, Request, status, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 
 from . import schemas, database, models
 from .config import settings
+from .utils.cache_utils import TTLCache
+from .utils.read_routing import READ_ONLY_METHODS
+from .utils.revocation_filter import RevocationFilter
+
+logger = logging.getLogger(__name__)
 
 
 oauth2_schema = OAuth2PasswordBearer(tokenUrl='login')
@@ -14,24 +25,149 @@ oauth2_schema = OAuth2PasswordBearer(tokenUrl='login')
 
 SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
-# TODO decrese up to 30 min
+# Keep short (~30 min): clients renew through /login/refresh
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days
 
-# TODO add Refresh Token
-def create_access_token(data: dict):
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
+revoked_tokens = RevocationFilter()
+
+# A revoked_tokens row gets the start time of its transaction as revoked_at, so one committed
+# just after a reload can carry an older timestamp than the newest row that reload saw
+REVOCATION_RELOAD_OVERLAP = timedelta(minutes=1)
+# revoked_at of the newest row loaded so far; later reloads only read rows from around there on
+_revocations_loaded_until: Optional[datetime] = None
+
+# Column values of recently authenticated users, keyed by id. Per worker, so a change
+# made through another worker shows up here after at most user_cache_ttl_seconds.
+user_cache = TTLCache(maxsize=settings.user_cache_max_size, ttl=settings.user_cache_ttl_seconds)
+
+_USER_COLUMNS = [attr.key for attr in inspect(models.User).column_attrs]
+
+def _encode_token(data: dict, token_type: str, expires_delta: timedelta) -> str:
     to_encode = data.copy()
 
-    expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    expire = datetime.now(timezone.utc) + expires_delta
+    to_encode.update({"exp": expire, "type": token_type, "jti": uuid.uuid4().hex})
 
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-    return encoded_jwt
 
+def create_access_token(data: dict):
+    return _encode_token(data, ACCESS_TOKEN_TYPE, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
 
-def verify_access_token(token: str, credentials_exception):      
+
+def create_refresh_token(data: dict):
+    return _encode_token(data, REFRESH_TOKEN_TYPE, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+
+
+def decode_token(token: str, credentials_exception, token_type: str = ACCESS_TOKEN_TYPE) -> dict:
+    """
+    Verify signature, expiry, type and revocation; returns the claims.
+
+    Only access tokens are checked against the in-memory revocation filter: a refresh token
+    is checked when redeemed, by the revocation insert in revoke_token.
+    Tokens issued before refresh tokens existed carry no `type`/`jti` and pass as access tokens.
+    """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise credentials_exception
+
+    if payload.get("type", ACCESS_TOKEN_TYPE) != token_type:
+        raise credentials_exception
+    if revoked_tokens.is_revoked(payload.get("jti")):
+        raise credentials_exception
+    if payload.get("user_id") is None:
+        raise credentials_exception
+
+    return payload
+
+
+def revoke_token(db: Session, payload: dict) -> bool:
+    """
+    Record the token as revoked. For an access token this worker stops accepting it
+    immediately, the others on their next reload of the revocation list.
+
+    Returns False when it was already revoked, e.g. by a concurrent request
+    with the same token: only one caller wins the insert.
+    """
+    jti = payload.get("jti")
+    if jti is None:
+        return True
+    token_type = payload.get("type", ACCESS_TOKEN_TYPE)
+    revoked = db.execute(
+        insert(models.RevokedToken)
+        .values(jti=jti, user_id=payload.get("user_id"), token_type=token_type,
+                expires_at=datetime.fromtimestamp(payload["exp"], timezone.utc))
+        .on_conflict_do_nothing(index_elements=[models.RevokedToken.jti])
+        .returning(models.RevokedToken.jti)
+    ).first()
+    db.commit()
+    if token_type == ACCESS_TOKEN_TYPE:
+        revoked_tokens.add(jti, payload["exp"])
+    return revoked is not None
+
+
+def load_revoked_tokens():
+    """
+    Load the revoked access tokens: all unexpired ones until there are any, then only those revoked since.
+    """
+    global _revocations_loaded_until
+    query_since = _revocations_loaded_until
+    with database.SessionLocal() as db:
+        query = db.query(models.RevokedToken.jti, models.RevokedToken.expires_at, models.RevokedToken.revoked_at) \
+            .filter(models.RevokedToken.token_type == ACCESS_TOKEN_TYPE,
+                    models.RevokedToken.expires_at > datetime.now(timezone.utc))
+        if query_since is not None:
+            query = query.filter(models.RevokedToken.revoked_at > query_since - REVOCATION_RELOAD_OVERLAP)
+        rows = query.all()
+
+    entries = [(jti, expires_at.timestamp()) for jti, expires_at, _ in rows]
+    if query_since is None:
+        revoked_tokens.replace(entries)
+    else:
+        revoked_tokens.update(entries)
+        revoked_tokens.prune()
+    if rows:
+        newest = max(revoked_at for _, _, revoked_at in rows)
+        _revocations_loaded_until = newest if query_since is None else max(query_since, newest)
+
+
+def purge_revoked_tokens() -> int:
+    """
+    Delete revocations of tokens that have expired anyway; returns how many rows went.
+    """
+    with database.SessionLocal() as db:
+        purged = db.query(models.RevokedToken) \
+            .filter(models.RevokedToken.expires_at <= datetime.now(timezone.utc)) \
+            .delete(synchronize_session=False)
+        db.commit()
+    return purged
+
+
+async def keep_revocations_fresh():
+    """
+    Background task (started in the app lifespan, after the initial load) that reloads the
+    revocation list and purges expired rows from the table.
+    """
+    while True:
+        await asyncio.sleep(settings.token_revocation_refresh_seconds)
+        try:
+            await run_in_threadpool(load_revoked_tokens)
+        except Exception as e:
+            logger.error(f"Failed to reload revoked tokens, keeping {len(revoked_tokens)} cached: {e}")
+        try:
+            await run_in_threadpool(purge_revoked_tokens)
+        except Exception as e:
+            logger.error(f"Failed to purge expired revoked tokens: {e}")
+
+
+def verify_access_token(token: str, credentials_exception):      
+    try:
+        payload = decode_token(token, credentials_exception)
         id: int = payload.get("user_id")
 
         if id is None:
@@ -42,15 +178,89 @@ def verify_access_token(token: str, credentials_exception):
         raise credentials_exception
     
     return token_data
-    
 
-def get_current_user(token:str = Depends(oauth2_schema), db: Session = Depends(database.get_db)) -> Optional[models.User]:
-    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, 
-                                          detail=f"Could not validate credentials", 
-                                          headers={"WWW-Autenticate": "Bearer"})
-    
-    token = verify_access_token(token, credentials_exception)
 
-    user = db.query(models.User).filter(models.User.id == token.id).first()
+def _credentials_exception() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, 
+                         detail=f"Could not validate credentials", 
+                         headers={"WWW-Autenticate": "Bearer"})
+
+
+def load_user(db: Session, user_id: int) -> Optional[models.User]:
+    """
+    Return the user attached to `db`, from the cache when possible.
+
+    A cache hit rebuilds the row without a query; relationships still lazy-load through `db`.
+    """
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        user = models.User(**cached)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
 
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if user is not None:
+        user_cache.set(user_id, {key: getattr(user, key) for key in _USER_COLUMNS})
     return user
+
+
+def invalidate_cached_user(user_id: int):
+    """
+    Call after changing or deleting a user row.
+    """
+    user_cache.invalidate(user_id)
+    
+
+def _authenticated_user_id(request: Request, token: str) -> int:
+    user_id = verify_access_token(token, _credentials_exception()).id
+    # Only verified callers may keep their reads on the primary (utils/read_routing.py)
+    if request.method not in READ_ONLY_METHODS:
+        database.read_your_writes.mark_write(user_id)
+    return user_id
+
+
+def get_current_user(request: Request, token:str = Depends(oauth2_schema), db: Session = Depends(database.get_db)) -> Optional[models.User]:
+    return load_user(db, _authenticated_user_id(request, token))
+
+
+def get_current_user_id(request: Request, token: str = Depends(oauth2_schema)) -> int:
+    """
+    For routes that only need the caller's id: validates the token without touching the database.
+    """
+    return _authenticated_user_id(request, token)
+
+
+class Principal:
+    """
+    The caller as decoded from the access token.
+
+    `id` comes straight from the token; reading any other attribute loads the
+    full User row (through the user cache) on first access.
+    """
+
+    def __init__(self, id: int, db: Session):
+        self.id = id
+        self._db = db
+        self._user: Optional[models.User] = None
+
+    @property
+    def user(self) -> models.User:
+        if self._user is None:
+            self._user = load_user(self._db, self.id)
+            if self._user is None:
+                raise _credentials_exception()
+        return self._user
+
+    def __getattr__(self, name):
+        # Only reached for attributes not defined on Principal itself
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+
+def get_current_principal(request: Request, token: str = Depends(oauth2_schema), db: Session = Depends(database.get_db)) -> Principal:
+    """
+    Drop-in for get_current_user on routes that mostly need `current_user.id`:
+    no query runs unless the handler reads another attribute.
+    """
+    return Principal(_authenticated_user_id(request, token), db)
@@ -1,9 +1,12 @@
+from typing import Optional, Union
 from fastapi import APIRouter, Depends, status, HTTPException, Response
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
 from ..utils import security_utils, story_utils
-from ..services import azure_storage_service
+from ..services import rate_limit_service, storage_service
 
 from .. import database , schemas, models, oauth2
 
@@ -12,31 +15,102 @@ router = APIRouter(
     tags=['Authentication']
 )
 
-@router.post('/', response_model=schemas.TokenWithUser)
-def login(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-    # username == email
-
-    user = db.query(models.User).filter(models.User.email == user_credentials.username).first()
+@router.post('/', response_model=Union[schemas.TokenWithUser, schemas.TokenWithUserSummary],
+             dependencies=[Depends(rate_limit_service.rate_limit("auth.login"))])
+async def login(user_credentials: OAuth2PasswordRequestForm = Depends(),
+                slim: bool = False,
+                db: AsyncSession = Depends(database.get_async_db)):
+    """
+    username == email. With `?slim=true` the user is returned as a UserSummary,
+    skipping the stories query and SAS signing so login cost doesn't grow with
+    the user's story count.
+    """
+    query = select(models.User).where(models.User.email == user_credentials.username)
+    if not slim:
+        query = query.options(selectinload(models.User.stories))
+    user = await db.scalar(query)
 
     if not user:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid Credentials")
     
-    if not security_utils.verify(user_credentials.password, user.password):
+    valid, new_hash = await security_utils.verify_and_update_async(user_credentials.password, user.password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid Credentials")
+
+    if new_hash:
+        # Hash was made with an older bcrypt cost; save the upgraded one before the
+        # object is modified for the response below
+        user.password = new_hash
+        await db.commit()
+        oauth2.invalidate_cached_user(user.id)
     
     access_token = oauth2.create_access_token(data = {"user_id": user.id})
+    refresh_token = oauth2.create_refresh_token(data = {"user_id": user.id})
 
-    user.profile_picture_url = azure_storage_service.add_sas_token(user.profile_picture_url)
+    if slim:
+        return schemas.TokenWithUserSummary(access_token=access_token,
+                                            refresh_token=refresh_token,
+                                            token_type="bearer",
+                                            user=schemas.UserSummary.model_validate(user))
+
+    user.profile_picture_url = storage_service.add_sas_token(user.profile_picture_url)
 
     # Remove expired stories from the list
     user.stories = story_utils.filter_expired_stories(user.stories)
 
     # Append SAS token to each story's media_url
     for story in user.stories:
-        story.media_url = azure_storage_service.add_sas_token(story.media_url)
+        story.media_url = storage_service.add_sas_token(story.media_url)
 
 
     return {"access_token": access_token, 
+            "refresh_token": refresh_token,
             "token_type": "bearer",
             "user":  user
     }
+
+
+@router.post('/refresh', response_model=schemas.Token)
+def refresh(request: schemas.RefreshTokenRequest, db: Session = Depends(database.get_db)):
+    """
+    Exchange a refresh token for a new access token. The refresh token is rotated:
+    the one sent is revoked and a new one is returned.
+    """
+    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                                          detail="Invalid or expired refresh token")
+
+    payload = oauth2.decode_token(request.refresh_token, credentials_exception, oauth2.REFRESH_TOKEN_TYPE)
+
+    if oauth2.load_user(db, payload["user_id"]) is None:
+        raise credentials_exception
+
+    # Two refreshes racing with the same token: the one that loses the revocation gets nothing
+    if not oauth2.revoke_token(db, payload):
+        raise credentials_exception
+
+    return {"access_token": oauth2.create_access_token(data = {"user_id": payload["user_id"]}),
+            "refresh_token": oauth2.create_refresh_token(data = {"user_id": payload["user_id"]}),
+            "token_type": "bearer"
+    }
+
+
+@router.post('/logout', status_code=status.HTTP_204_NO_CONTENT)
+def logout(request: Optional[schemas.RefreshTokenRequest] = None,
+           token: str = Depends(oauth2.oauth2_schema),
+           db: Session = Depends(database.get_db)):
+    """
+    Revoke the access token used for this call and, if given, the refresh token.
+    """
+    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                                          detail="Could not validate credentials")
+
+    access_payload = oauth2.decode_token(token, credentials_exception)
+    oauth2.revoke_token(db, access_payload)
+
+    if request is not None:
+        refresh_payload = oauth2.decode_token(request.refresh_token, credentials_exception, oauth2.REFRESH_TOKEN_TYPE)
+        if refresh_payload["user_id"] != access_payload["user_id"]:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Refresh token belongs to another user")
+        oauth2.revoke_token(db, refresh_payload)
+
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -12,7 +12,7 @@ router = APIRouter(
 @router.post("/", response_model=schemas.CommentResponse, status_code=status.HTTP_201_CREATED)
 async def comment(comment: schemas.CommentCreate, 
                   db: Session = Depends(database.get_db), 
-                  current_user: dict = Depends(oauth2.get_current_user)):
+                  current_user: oauth2.Principal = Depends(oauth2.get_current_principal)):
     
 
     new_comment = models.Comment(user_id=current_user.id, **comment.model_dump())
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, status,
 from sqlalchemy.orm import Session
 from .. import models, schemas, oauth2
 from ..database import get_db
+from ..services import media_service
 from ..utils import file_utils
 import logging
 
@@ -18,6 +19,7 @@ async def complain(
     entity_id: int = Form(...),
     reason: str = Form(...),
     file: UploadFile | None = File(None),
+    upload_token: str | None = Form(None),  # from POST /uploads, instead of file
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user),
 ):
@@ -55,9 +57,11 @@ async def complain(
         raise HTTPException(status_code=409, detail="You already complained about this entity")
 
     evidence_url = None
-    if file is not None:
+    if upload_token:
+        evidence_url = (await file_utils.resolve_upload(None, upload_token, current_user.id,
+                                                        schemas.UploadPurpose.complaint)).url
+    elif file is not None:
         try:
-            # Assuming upload_complaint_file can be async, otherwise remove await
             evidence_url = await file_utils.upload_complaint_file(file)
         except Exception as e:
             logger.error(f"File upload failed: {e}")
@@ -73,7 +77,8 @@ async def complain(
 
     try:
         db.add(complaint)
-        db.commit()
+        async with media_service.released_on_error((evidence_url, None)):
+            db.commit()
         db.refresh(complaint)
     except Exception as e:
         db.rollback()
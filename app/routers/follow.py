@@ -5,11 +5,11 @@ from datetime import datetime, timezone, timedelta
 from datetime import datetime
 from fastapi import Body, File, Form, Query, UploadFile, status, HTTPException, Depends, APIRouter, Response
 from pydantic import ValidationError
-from sqlalchemy.orm import Session, joinedload, aliased
+from sqlalchemy.orm import Session, joinedload, aliased, selectinload
 from sqlalchemy.exc import IntegrityError
 
 from ..utils import security_utils, file_utils, story_utils
-from ..services import azure_storage_service
+from ..services import storage_service
 from ..database import get_db
 
 from .. import models, schemas, oauth2
@@ -82,7 +82,7 @@ def follow_user(
 def unfollow_user(
     receiver_id: int = Query(..., description="ID of the user to unfollow"),
     db: Session = Depends(get_db),
-    current_user: dict = Depends(oauth2.get_current_user)
+    current_user: oauth2.Principal = Depends(oauth2.get_current_principal)
 ) -> Response:
     """
     This endpoint allows a user to unfollow another user.
@@ -133,6 +133,7 @@ def get_followers(
         db.query(models.User, 
                  models.UserRelationship.status.label("follow_status"))
         .join(models.UserRelationship, models.UserRelationship.requester_id == models.User.id)
+        .options(selectinload(models.User.stories), selectinload(models.User.pets))
         .filter(
             models.UserRelationship.receiver_id == user_id,
             models.UserRelationship.status == schemas.UserRelationshipStatus.ACCEPTED
@@ -167,6 +168,7 @@ def get_following(
         db.query(models.User, 
                  models.UserRelationship.status.label("follow_status"))
         .join(models.UserRelationship, models.UserRelationship.receiver_id == models.User.id)
+        .options(selectinload(models.User.stories), selectinload(models.User.pets))
         .filter(
             models.UserRelationship.requester_id == user_id,
             models.UserRelationship.status == schemas.UserRelationshipStatus.ACCEPTED
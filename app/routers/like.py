@@ -1,5 +1,6 @@
 from fastapi import FastAPI, Response, status, HTTPException, Depends, APIRouter
-from sqlalchemy.orm import Session
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import schemas, database, models, oauth2
 
 router = APIRouter(
@@ -8,32 +9,31 @@ router = APIRouter(
 )
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-async def like(like: schemas.Like, db: Session = Depends(database.get_db), current_user: dict = Depends(oauth2.get_current_user)):
+async def like(like: schemas.Like, db: AsyncSession = Depends(database.get_async_db), current_user: oauth2.Principal = Depends(oauth2.get_current_principal)):
 
-    post = db.query(models.Post).filter(models.Post.id == like.post_id).first()
+    post = await db.scalar(select(models.Post).where(models.Post.id == like.post_id))
 
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Post with id: {like.post_id} does not exist")
 
-    like_query = db.query(models.Like).filter(models.Like.post_id == like.post_id, 
-                                              models.Like.user_id == current_user.id)
-    
-    found_like = like_query.first()
+    found_like = await db.scalar(select(models.Like).where(models.Like.post_id == like.post_id,
+                                                          models.Like.user_id == current_user.id))
 
     if (like.dir == 1):
         if found_like:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, 
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT,
                                 detail=f"user {current_user.id} has already liked on post {like.post_id}")
         new_like = models.Like(post_id = like.post_id, user_id = current_user.id)
         db.add(new_like)
         post.likes_count += 1
-        db.commit()
+        await db.commit()
         return {"message": "successfully added like"}
     else:
         if not found_like:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Like does not exist")
-        
-        like_query.delete(synchronize_session=False)
+
+        await db.execute(delete(models.Like).where(models.Like.post_id == like.post_id,
+                                                   models.Like.user_id == current_user.id))
         post.likes_count -= 1
-        db.commit()
+        await db.commit()
         return {"message": "successfully deleted like"}
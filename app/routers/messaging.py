@@ -25,13 +25,16 @@ Key Models:
 Endpoint Summary:
 """
 from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session, aliased
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased, selectinload
 from datetime import datetime
 from typing import List, Dict
 import math
 
 from .. import schemas, models, oauth2
-from ..database import get_db
+from ..services import metrics_service
+from ..database import get_db, get_async_db
 
 router = APIRouter(prefix="/messaging", tags=["Messaging"])
 
@@ -57,6 +60,7 @@ class ConnectionManager:
 
 
 manager = ConnectionManager()
+metrics_service.WEBSOCKET_CONNECTIONS.set_function(lambda: len(manager.active_connections))
 
 
 @router.websocket("/ws/{user_id}")
@@ -175,17 +179,24 @@ def get_conversations(
     # Get conversations ordered by last activity
     convs = db.query(models.Conversation).join(models.Participant).filter(
         models.Participant.user_id == current_user.id
+    ).options(
+        selectinload(models.Conversation.participants)
     ).order_by(
         models.Conversation.last_message_at.desc()
     ).offset(skip).limit(limit).all()
-    
-    # Eager load participants and last message
+
+    # Last message of every conversation on the page in one query
+    last_messages = db.query(models.Message).filter(
+        models.Message.conversation_id.in_([conv.id for conv in convs])
+    ).distinct(
+        models.Message.conversation_id
+    ).order_by(
+        models.Message.conversation_id, models.Message.id.desc()
+    ).all() if convs else []
+    last_by_conversation = {message.conversation_id: message for message in last_messages}
     for conv in convs:
-        db.refresh(conv)  # Load relationships
-        conv.participants  # Force load
-        if conv.messages:
-            conv.last_message = conv.messages[-1]  # Last message
-    
+        conv.last_message = last_by_conversation.get(conv.id)
+
     return convs
 
 
@@ -193,8 +204,8 @@ def get_conversations(
 async def send_message(
     conversation_id: int,
     message: schemas.MessageCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_principal)
 ):
     """
     Send message to conversation
@@ -205,10 +216,10 @@ async def send_message(
       3. Notifies participants via WebSocket
     """
     # Verify user is in conversation
-    participant = db.query(models.Participant).filter(
+    participant = await db.scalar(select(models.Participant).where(
         models.Participant.conversation_id == conversation_id,
         models.Participant.user_id == current_user.id
-    ).first()
+    ))
     
     if not participant:
         raise HTTPException(status_code=403, detail="Not in conversation")
@@ -223,16 +234,16 @@ async def send_message(
     db.add(db_message)
     
     # Update conversation timestamp
-    conversation = db.query(models.Conversation).get(conversation_id)
+    conversation = await db.get(models.Conversation, conversation_id)
     conversation.last_message_at = datetime.utcnow()
     
-    db.commit()
-    db.refresh(db_message)
+    await db.commit()
+    await db.refresh(db_message)
     
     # Notify participants via WebSocket
-    participants = db.query(models.Participant).filter(
+    participants = (await db.scalars(select(models.Participant).where(
         models.Participant.conversation_id == conversation_id
-    ).all()
+    ))).all()
     
     for p in participants:
         if p.user_id != current_user.id:  # Don't notify self
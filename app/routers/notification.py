@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, Query
-from sqlalchemy import literal, desc, cast, Integer, select, union_all
+from sqlalchemy import literal, desc, cast, func, Integer, select, union_all, Select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from .. import models, schemas, oauth2
-from ..database import get_db
+from ..database import get_async_db
 from ..utils.file_utils import add_sas_token_to_url
 
 
@@ -14,88 +14,91 @@ router = APIRouter(
 )
 
 
+def _user_thumbnail():
+    # Notifications show small avatars: use the thumbnail variant when the picture has one
+    return func.coalesce(models.User.profile_picture_variants["thumb"].astext, models.User.profile_picture_url)
+
+
 def build_query(
-    db: Session, 
     notification_type: str, 
     model, 
     user_id_field, 
     post_id_field, 
     current_user_id: int, 
     content_field=None
-) -> Query:
+) -> Select:
     """
     Builds a query for the given notification type (comment or like).
     """
     query = (
-        db.query(
+        select(
             user_id_field.label("user_id"),
             post_id_field.label("post_id"),
             model.created_at.label("created_at"),
-            models.User.profile_picture_url.label("user_photo_url"),
+            _user_thumbnail().label("user_photo_url"),
             models.User.name.label("user_name"),
-            models.Post.media_url.label("post_photo_url"),
+            func.coalesce(models.Post.media_variants["thumb"].astext, models.Post.media_url).label("post_photo_url"),
             literal(notification_type).label("type"),
             content_field.label("comment") if content_field else literal(None).label("comment")
         )
         .join(models.Post, model.post_id == models.Post.id)
         .join(models.User, model.user_id == models.User.id)
-        .filter(models.Post.user_id == current_user_id)
+        .where(models.Post.user_id == current_user_id)
     )
     return query
 
 
 def build_follow_query(
-    db: Session,
     notification_type: str,
     current_user_id: int,
     is_accepted: bool = False
-) -> Query:
+) -> Select:
     """
     Builds a query for follow request or follow accepted notifications.
     """
     query = (
-        db.query(
+        select(
             models.UserRelationship.requester_id.label("user_id"),
             cast(None, Integer).label("post_id"),
             models.UserRelationship.created_at.label("created_at"),
-            models.User.profile_picture_url.label("user_photo_url"),
+            _user_thumbnail().label("user_photo_url"),
             models.User.name.label("user_name"),
             literal(None).label("post_photo_url"),
             literal(notification_type).label("type"),
             literal(None).label("comment"),
         )
         .join(models.User, models.UserRelationship.requester_id == models.User.id)
-        .filter(models.UserRelationship.receiver_id == current_user_id)
+        .where(models.UserRelationship.receiver_id == current_user_id)
     )
 
     if is_accepted:
-        query = query.filter(models.UserRelationship.status == 'accepted')
+        query = query.where(models.UserRelationship.status == 'accepted')
     else:
-        query = query.filter(models.UserRelationship.status == 'pending')
+        query = query.where(models.UserRelationship.status == 'pending')
 
     return query
 
 
 @router.get("/", response_model=List[schemas.NotificationResponse])
 async def get_notifications(
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(oauth2.get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_principal),
     limit: int = 10, skip: int = 0,
 ):
     try:
         # Build individual queries and convert them into subqueries
         comments_query = build_query(
-            db, 'comment', models.Comment, models.Comment.user_id,
+            'comment', models.Comment, models.Comment.user_id,
             models.Comment.post_id, current_user.id, models.Comment.content
         ).subquery()
 
         likes_query = build_query(
-            db, 'like', models.Like, models.Like.user_id,
+            'like', models.Like, models.Like.user_id,
             models.Like.post_id, current_user.id
         ).subquery()
 
         follow_requests_query = build_follow_query(
-            db, 'follow', current_user.id, is_accepted=True
+            'follow', current_user.id, is_accepted=True
         ).subquery()
 
         # Combine all subqueries using UNION ALL
@@ -107,13 +110,13 @@ async def get_notifications(
 
         # Now order by combined_query.c.created_at
         final_query = (
-            db.query(combined_query)
+            select(combined_query)
             .order_by(desc(combined_query.c.created_at))
             .offset(skip)
             .limit(limit)
         )
 
-        results = final_query.all()
+        results = (await db.execute(final_query)).all()
 
         return [schemas.NotificationResponse(**r._asdict()) for r in results]
 
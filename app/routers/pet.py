@@ -9,7 +9,7 @@ import json
 import logging
 
 from ..utils import security_utils, file_utils
-from ..services import azure_storage_service
+from ..services import media_service, storage_service
 from ..database import get_db
 
 from .. import models, schemas, oauth2
@@ -184,6 +184,7 @@ async def create_pet(
     # pet: schemas.PetCreate, 
     pet: str = Form(...),
     file: UploadFile = File(None),
+    upload_token: Optional[str] = Form(None),  # from POST /uploads, instead of file
     db: Session = Depends(get_db), 
     current_user: dict = Depends(oauth2.get_current_user)
     ):
@@ -199,15 +200,18 @@ async def create_pet(
 
     new_pet = models.Pet(user_id=current_user.id, **pet.model_dump())
 
-    if file and file.size :
-        try:
-            picture_url = file_utils.upload_profile_picture(file)
-            new_pet.profile_picture_url = picture_url
-        except IntegrityError as e:
-            logger.error(f"Integrity error during file upload: {e}")
+    picture = None
+    try:
+        picture = await file_utils.resolve_upload(file, upload_token, current_user.id,
+                                                  schemas.UploadPurpose.pet_profile_picture)
+        if picture:
+            new_pet.profile_picture_url, new_pet.profile_picture_variants = picture
+    except IntegrityError as e:
+        logger.error(f"Integrity error during file upload: {e}")
 
     db.add(new_pet)
-    db.commit()
+    async with media_service.released_on_error(picture):
+        db.commit()
     db.refresh(new_pet)
 
     return new_pet
@@ -269,32 +273,12 @@ async def get_pet(id: int, db: Session = Depends(get_db), current_user: dict = D
     return pet
 
 
-# TODO delete also image from azure storage
-@router.delete("/id", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_pet(id: int, db: Session = Depends(get_db), current_user: dict = Depends(oauth2.get_current_user)):
-    pet_query = db.query(models.Pet).filter(models.Pet.id == id)
-
-    pet = pet_query.first()
-
-    if pet == None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail=f"pet with id {id} does not exist")
-    
-    if pet.user_id != current_user.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
-                            detail="Not authorized to perform requested action")
-    
-    pet_query.delete(synchronize_session=False)
-    db.commit()
-
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
-
-
 # TODO separate folder for pet's imagie
 @router.post("/{id}/upload-profile-picture", response_model=schemas.PetResponse)
 async def upload_profile_picture(
     id: int,
-    file: UploadFile = File(...),
+    file: UploadFile = File(None),
+    upload_token: Optional[str] = Form(None),  # from POST /uploads, instead of file
     db: Session = Depends(get_db),
     current_user: dict = Depends(oauth2.get_current_user),
 ):
@@ -308,10 +292,19 @@ async def upload_profile_picture(
                             detail="Not authorized to perform request action")
     
     try:
-        picture_url = file_utils.upload_profile_picture(file)
-        pet.profile_picture_url = picture_url
-        db.commit()
+        picture = await file_utils.resolve_upload(file, upload_token, current_user.id,
+                                                  schemas.UploadPurpose.pet_profile_picture)
+        if not picture:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail="Send a file or an upload_token")
+        previous = (pet.profile_picture_url, pet.profile_picture_variants)
+        pet.profile_picture_url, pet.profile_picture_variants = picture
+        async with media_service.released_on_error(picture):
+            db.commit()
         db.refresh(pet)
+        await media_service.release(*previous)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"File upload error for ise {id}: {e}")
         raise HTTPException(
@@ -365,13 +358,10 @@ async def delete_pet(id: int, db: Session = Depends(get_db), current_user: dict
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail="Not authorized to perform requested action")
 
-    # Delete image from Azure Storage
-    if pet.profile_picture_url:
-        try:
-            file_utils.delete_blob(pet.profile_picture_url)
-        except Exception as e:
-            logger.warning(f"Failed to delete image from Azure: {e}")
-
+    # The pet's stories go with it (ON DELETE CASCADE)
+    media = [(pet.profile_picture_url, pet.profile_picture_variants),
+             *db.query(models.Story.media_url, models.Story.media_variants).filter(models.Story.pet_id == id).all()]
     pet_query.delete(synchronize_session=False)
     db.commit()
+    await media_service.release_all(media)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
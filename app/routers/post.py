@@ -4,15 +4,16 @@ from sqlite3 import IntegrityError
 from fastapi import Response, UploadFile, status, HTTPException, Depends, APIRouter, Form, File, Query
 from pydantic import ValidationError
 from sqlalchemy.sql import func
-from sqlalchemy import func, desc, asc
-from sqlalchemy.orm import Session
+from sqlalchemy import func, desc, asc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 
 from ..utils import file_utils
-from ..services import azure_storage_service
+from ..services import media_service, storage_service
 
 from .. import models, schemas, oauth2
-from ..database import engine, get_db
+from ..database import engine, get_db, get_async_db
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger  = logging.getLogger(__name__)
@@ -27,7 +28,8 @@ router = APIRouter(
 async def create_posts(
     # post: schemas.PostCreate, 
     post: str = Form(...),
-    file: UploadFile = File(...),
+    file: UploadFile = File(None),
+    upload_token: Optional[str] = Form(None),  # from POST /uploads, instead of file
     db: Session = Depends(get_db), 
     current_user: dict = Depends(oauth2.get_current_user)):
     
@@ -41,31 +43,35 @@ async def create_posts(
     
     new_post = models.Post(user_id=current_user.id, **post.model_dump())
     
-    if file and file.size:
-        try:
-            media_url = file_utils.upload_profile_picture(file)
-            new_post.media_url = media_url
-        except IntegrityError as e:
-            logger.error(f"Integrity error during file upload: {e}")
+    media = None
+    try:
+        media = await file_utils.resolve_upload(file, upload_token, current_user.id, schemas.UploadPurpose.post)
+        if media:
+            new_post.media_url, new_post.media_variants = media
+    except IntegrityError as e:
+        logger.error(f"Integrity error during file upload: {e}")
 
     db.add(new_post)
-    db.commit()
+    async with media_service.released_on_error(media):
+        db.commit()
     db.refresh(new_post)
 
-    if new_post.media_url:
-        sas_token = azure_storage_service.create_service_sas_container()
-        new_post.media_url = f"{new_post.media_url}?{sas_token}"
+    new_post.media_url = storage_service.add_sas_token(new_post.media_url)
 
     return new_post
 
 
 @router.get("/{id}", response_model=schemas.PostResponse)
-async def get_post(id: int, db: Session = Depends(get_db), current_user: dict = Depends(oauth2.get_current_user)):
+async def get_post(id: int, db: AsyncSession = Depends(get_async_db), current_user: oauth2.Principal = Depends(oauth2.get_current_principal)):
 
     # post = db.query(models.Post, func.count(models.Vote.post_id).label("votes")).join(
     #         models.Vote, models.Vote.post_id == models.Post.id, isouter=True).group_by(models.Post.id).filter(models.Post.id == id).first()
 
-    post = db.query(models.Post).filter(models.Post.id == id).first()
+    post = await db.scalar(
+        select(models.Post)
+        .options(selectinload(models.Post.user), selectinload(models.Post.pet))
+        .where(models.Post.id == id)
+    )
 
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
@@ -73,16 +79,13 @@ async def get_post(id: int, db: Session = Depends(get_db), current_user: dict =
         # response.status_code = status.HTTP_404_NOT_FOUND
         # return {'message': f"post with id: {id} was not found"}
 
-    if post.media_url:
-        sas_token = azure_storage_service.create_service_sas_container()
-        post.media_url = f"{post.media_url}?{sas_token}"
+    post.media_url = storage_service.add_sas_token(post.media_url)
 
     return post
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_post(id: int, db: Session = Depends(get_db), current_user: dict = Depends(oauth2.get_current_user)):
-    # TODO add removing photo from storage account
+async def delete_post(id: int, db: Session = Depends(get_db), current_user: oauth2.Principal = Depends(oauth2.get_current_principal)):
     post_query = db.query(models.Post).filter(models.Post.id == id)
 
     post = post_query.first()
@@ -95,8 +98,10 @@ async def delete_post(id: int, db: Session = Depends(get_db), current_user: dict
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail="Not authorized to perform requested action")
     
+    media = (post.media_url, post.media_variants)
     post_query.delete(synchronize_session=False)
     db.commit()
+    await media_service.release(*media)
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
@@ -127,8 +132,8 @@ async def update_post(id: int, updated_post: schemas.PostCreate, db: Session = D
 
 @router.get("/", response_model=List[schemas.PostResponse])
 async def get_posts(
-    db: Session = Depends(get_db), 
-    current_user: dict = Depends(oauth2.get_current_user),
+    db: AsyncSession = Depends(get_async_db), 
+    current_user: oauth2.Principal = Depends(oauth2.get_current_principal),
     user_id: Optional[int] = None,
     pet_id: Optional[int] = None,
     limit: int = Query(10, ge=1, le=100),
@@ -162,20 +167,20 @@ async def get_posts(
     - Raises an HTTP 500 error if the query fails.
     """
     try:
-        # Start query from Post table
-        query = db.query(models.Post)
+        # Start query from Post table, eager loading what PostResponse serializes
+        query = select(models.Post).options(selectinload(models.Post.user), selectinload(models.Post.pet))
 
         # Filter by user_id if provided
         if user_id:
-            query = query.filter(models.Post.user_id == user_id)
+            query = query.where(models.Post.user_id == user_id)
 
         # Filter by pet_id if provided
         if pet_id:
-            query = query.filter(models.Post.pet_id == pet_id)
+            query = query.where(models.Post.pet_id == pet_id)
 
         # Apply full-text search on post content
         if search:
-            query = query.filter(models.Post.content.ilike(f"%{search}%"))
+            query = query.where(models.Post.content.ilike(f"%{search}%"))
 
         # Dynamic ordering
         if hasattr(models.Post, order_by):
@@ -189,13 +194,11 @@ async def get_posts(
             query = query.order_by(desc(models.Post.created_at))
 
         # Apply pagination
-        posts = query.offset(skip).limit(limit).all()
+        posts = (await db.scalars(query.offset(skip).limit(limit))).all()
 
         # Append SAS token to media URLs for secure access
         for post in posts:
-            if post.media_url:
-                sas_token = azure_storage_service.create_service_sas_container()
-                post.media_url = f"{post.media_url}?{sas_token}"
+            post.media_url = storage_service.add_sas_token(post.media_url)
         return posts
 
     except Exception as e:
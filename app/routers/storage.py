@@ -0,0 +1,82 @@
+import tempfile
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
+
+from ..config import settings
+from ..services import storage_service, upload_policy_service
+from ..utils.file_signatures import SNIFF_BYTES, UNDECLARED_TYPE, sniff
+from ..utils.storage_backends import PRIVATE, PUBLIC, AppServedBackend
+
+# Serves blobs of the local and memory storage backends, which have no server of their own.
+# Azure blobs are fetched from Azure directly, so with that backend every route here is a 404
+router = APIRouter(
+    prefix="/storage",
+    tags=["Storage"],
+    include_in_schema=False,
+)
+
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+# Blobs are served from the API's own origin: browsers must not guess a type other than the stored one
+SERVE_HEADERS = {"X-Content-Type-Options": "nosniff"}
+
+
+def _backend() -> AppServedBackend:
+    backend = storage_service.get_backend()
+    if not isinstance(backend, AppServedBackend):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    return backend
+
+
+@router.api_route("/{area}/{blob_name:path}", methods=["GET", "HEAD"])
+async def get_blob(area: str, blob_name: str, request: Request):
+    backend = _backend()
+    if area not in (PRIVATE, PUBLIC):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    if area == PRIVATE and not backend.verify(blob_name, request.query_params, "r"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired signature")
+
+    public = area == PUBLIC
+    properties = await backend.get_properties(blob_name, public=public)
+    if properties is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Blob not found")
+
+    headers = dict(SERVE_HEADERS)
+    if properties.cache_control:
+        headers["Cache-Control"] = properties.cache_control
+    if request.method == "HEAD":
+        headers["Content-Length"] = str(properties.size)
+        return Response(media_type=properties.content_type, headers=headers)
+    return Response(content=await backend.download(blob_name, public=public),
+                    media_type=properties.content_type, headers=headers)
+
+
+@router.put("/private/{blob_name:path}", status_code=status.HTTP_201_CREATED)
+async def put_blob(blob_name: str, request: Request):
+    """
+    Target of direct uploads (upload_url from POST /uploads). The blob is stored
+    with the type its content was sniffed as, not the one the client sent.
+    """
+    backend = _backend()
+    if not backend.verify(blob_name, request.query_params, "cw"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired signature")
+    upload_policy_service.check_declared_type(None, request.headers.get("content-type"))
+
+    too_large = HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                              detail=f"File is larger than {settings.direct_upload_max_bytes} bytes")
+    if int(request.headers.get("content-length") or 0) > settings.direct_upload_max_bytes:
+        raise too_large
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as body:
+        size = 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > settings.direct_upload_max_bytes:
+                raise too_large
+            body.write(chunk)
+        body.seek(0)
+        content_type = sniff(body.read(SNIFF_BYTES)) or UNDECLARED_TYPE
+        body.seek(0)
+        await backend.upload(blob_name, body, content_type)
+
+    return Response(status_code=status.HTTP_201_CREATED)
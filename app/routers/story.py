@@ -4,13 +4,13 @@ from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFil
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from sqlite3 import IntegrityError
-from typing import List
+from typing import List, Optional
 
 from ..database import get_db
 
 from .. import schemas, models, oauth2
 from ..utils import file_utils
-from ..services import azure_storage_service
+from ..services import media_service, storage_service
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger  = logging.getLogger(__name__)
@@ -26,6 +26,7 @@ router = APIRouter(
 async def create_story(
     story: str = Form(...),
     file: UploadFile = File(None),
+    upload_token: Optional[str] = Form(None),  # from POST /uploads, instead of file
     db: Session = Depends(get_db),
     current_user: dict = Depends(oauth2.get_current_user)
 ):
@@ -40,20 +41,20 @@ async def create_story(
 
     new_story = models.Story(user_id=current_user.id, **story.model_dump())
 
-    if file and file.size:
-        try:
-            media_url = file_utils.upload_profile_picture(file)
-            new_story.media_url = media_url
-        except IntegrityError as e:
-            logger.error(f"Integrity error during file upload: {e}")
+    media = None
+    try:
+        media = await file_utils.resolve_upload(file, upload_token, current_user.id, schemas.UploadPurpose.story)
+        if media:
+            new_story.media_url, new_story.media_variants = media
+    except IntegrityError as e:
+        logger.error(f"Integrity error during file upload: {e}")
 
     db.add(new_story)
-    db.commit()
+    async with media_service.released_on_error(media):
+        db.commit()
     db.refresh(new_story)
 
-    if new_story.media_url:
-        sas_token = azure_storage_service.create_service_sas_container()
-        new_story.media_url = f"{new_story.media_url}?{sas_token}"
+    new_story.media_url = storage_service.add_sas_token(new_story.media_url)
 
     return new_story
 
@@ -62,7 +63,7 @@ async def create_story(
 async def delete_story(
     id: int,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(oauth2.get_current_user),
+    current_user: oauth2.Principal = Depends(oauth2.get_current_principal),
 ):
     story_query = db.query(models.Story).filter(models.Story.id == id)
     story = story_query.one_or_none()
@@ -79,8 +80,10 @@ async def delete_story(
             detail="Not authorized to perform this action"
         )
     
+    media = (story.media_url, story.media_variants)
     story_query.delete(synchronize_session=False)
     db.commit()
+    await media_service.release(*media)
 
     return None
 
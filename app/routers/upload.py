@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, status
+
+from .. import schemas, oauth2
+from ..services import direct_upload_service
+
+router = APIRouter(
+    prefix="/uploads",
+    tags=["Uploads"]
+)
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.DirectUploadResponse)
+def create_upload(
+    request: schemas.DirectUploadRequest,
+    user_id: int = Depends(oauth2.get_current_user_id),
+):
+    """
+    Upload media straight to storage: PUT the file to `upload_url` with `headers`,
+    then pass `upload_token` to the endpoint creating the post, story, profile picture
+    or complaint instead of sending the file through the API.
+    """
+    return direct_upload_service.issue_upload(user_id, request)
@@ -1,6 +1,6 @@
 import json
 import logging
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timezone, timedelta
 from datetime import datetime
 from fastapi import Body, File, Form, Query, UploadFile, status, HTTPException, Depends, APIRouter
@@ -9,7 +9,7 @@ from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import IntegrityError
 
 from ..utils import security_utils, file_utils, story_utils, otp_code_generator
-from ..services import azure_storage_service, email_service
+from ..services import email_service, media_service, rate_limit_service, storage_service
 from ..database import get_db
 
 from .. import models, schemas, oauth2
@@ -45,11 +45,12 @@ def process_user_stories(users, include_expired):
         if not include_expired:
             user.stories = story_utils.filter_expired_stories(user.stories)
         for story in user.stories:
-            story.media_url = azure_storage_service.add_sas_token(story.media_url)
+            story.media_url = storage_service.add_sas_token(story.media_url)
     return users
 
 
-@router.post("/send-verification-email", status_code=status.HTTP_200_OK)
+@router.post("/send-verification-email", status_code=status.HTTP_200_OK,
+             dependencies=[Depends(rate_limit_service.rate_limit("user.send_verification_email"))])
 async def send_verification_email(email: EmailStr = Form(...)):
     try:
         otp_code = otp_code_generator.generate_code(email)
@@ -82,7 +83,7 @@ async def create_user(
                             detail=f"Invalid or expired OTP code {user.otp_code}")
     
     # hash the password  - user.password
-    user.password = security_utils.hash(user.password)
+    user.password = await security_utils.hash_async(user.password)
 
     # Check if the phone already exists
     existing_user_phone = db.query(models.User).filter(models.User.phone == user.phone).first()
@@ -98,16 +99,18 @@ async def create_user(
 
     new_user = models.User(**user.model_dump(exclude={"otp_code"}))
 
+    picture = None
     if file and file.size:
         try:
-            picture_url = file_utils.upload_profile_picture(file)
-            new_user.profile_picture_url = picture_url
+            picture = await file_utils.upload_image(file)
+            new_user.profile_picture_url, new_user.profile_picture_variants = picture
         except IntegrityError as e:
             logger.error(f"Integrity error during file upload: {e}")
 
     db.add(new_user)
     try:
-        db.commit()
+        async with media_service.released_on_error(picture):
+            db.commit()
         db.refresh(new_user)
     except IntegrityError:
         db.rollback()
@@ -116,7 +119,7 @@ async def create_user(
             detail="User creation failed due to a database integrity issue"
         )
 
-    # new_user.profile_picture_url = azure_storage_service.add_sas_token(new_user.profile_picture_url)
+    # new_user.profile_picture_url = storage_service.add_sas_token(new_user.profile_picture_url)
 
     return new_user
 
@@ -192,14 +195,15 @@ def get_user(id: int, db: Session = Depends(get_db),  current_user: dict = Depen
 
     # Append SAS token to each story's media_url
     for story in user.stories:
-        story.media_url = azure_storage_service.add_sas_token(story.media_url)
+        story.media_url = storage_service.add_sas_token(story.media_url)
 
     return user
  
 # TODO separate folder for user's imagie
 @router.post("/{id}/upload-profile-picture", response_model=schemas.UserResponse)
 async def uplaod_profile_picture(id: int, 
-                                 file: UploadFile = File(...), 
+                                 file: UploadFile = File(None), 
+                                 upload_token: Optional[str] = Form(None),  # from POST /uploads, instead of file
                                  db: Session = Depends(get_db), 
                                  current_user: dict = Depends(oauth2.get_current_user),):
     
@@ -213,10 +217,20 @@ async def uplaod_profile_picture(id: int,
                             detail="Not authorized to perform requested action")
     
     try:
-        picture_url = file_utils.upload_profile_picture(file)
-        user.profile_picture_url = picture_url
-        db.commit()
+        picture = await file_utils.resolve_upload(file, upload_token, current_user.id,
+                                                  schemas.UploadPurpose.user_profile_picture)
+        if not picture:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail="Send a file or an upload_token")
+        previous = (user.profile_picture_url, user.profile_picture_variants)
+        user.profile_picture_url, user.profile_picture_variants = picture
+        async with media_service.released_on_error(picture):
+            db.commit()
+        oauth2.invalidate_cached_user(user.id)
         db.refresh(user)
+        await media_service.release(*previous)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"File upload error for user {id}: {e}")
         raise HTTPException(
@@ -224,14 +238,14 @@ async def uplaod_profile_picture(id: int,
             detail="Failed to upload profile picture"
         ) 
     
-    # user.profile_picture_url = azure_storage_service.add_sas_token(user.profile_picture_url)
+    # user.profile_picture_url = storage_service.add_sas_token(user.profile_picture_url)
 
     # Remove expired stories from the list
     user.stories = story_utils.filter_expired_stories(user.stories)
 
     # Append SAS token to each story's media_url
     for story in user.stories:
-        story.media_url = azure_storage_service.add_sas_token(story.media_url)
+        story.media_url = storage_service.add_sas_token(story.media_url)
 
     return user
 
@@ -258,6 +272,7 @@ async def update_user(
 
     try:
         db.commit()
+        oauth2.invalidate_cached_user(user.id)
         db.refresh(user)
     except IntegrityError:
         db.rollback()
@@ -283,7 +298,15 @@ async def delete_user(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail="Not authorized to delete this user")
 
+    # Posts, stories and pets go with the user (ON DELETE CASCADE)
+    media = [(user.profile_picture_url, user.profile_picture_variants),
+             *db.query(models.Post.media_url, models.Post.media_variants).filter(models.Post.user_id == id).all(),
+             *db.query(models.Story.media_url, models.Story.media_variants).filter(models.Story.user_id == id).all(),
+             *db.query(models.Pet.profile_picture_url, models.Pet.profile_picture_variants)
+                 .filter(models.Pet.user_id == id).all()]
     db.delete(user)
     db.commit()
+    oauth2.invalidate_cached_user(id)
+    await media_service.release_all(media)
 
     return None
@@ -1,9 +1,9 @@
 from datetime import datetime, date
-from typing import Optional, List, Literal
+from typing import Optional, List, Literal, Dict
 from pydantic import BaseModel, EmailStr, conint, field_serializer, field_validator, model_serializer, Field, HttpUrl
 import phonenumbers
 from .utils.security_utils import validate_phone_number
-from .services.azure_storage_service import add_sas_token
+from .services.storage_service import add_sas_token, public_url
 
 # TODO separate models by files
 # project/
@@ -30,6 +30,13 @@ from .services.azure_storage_service import add_sas_token
 
 from enum import Enum
 
+
+def sign_variants(variants: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    # {variant: url} as stored by image_service, each url signed like the original
+    if not variants:
+        return variants
+    return {name: add_sas_token(url) for name, url in variants.items()}
+
 class Gender(str, Enum):
     MALE = "M"
     FEMALE = "F"
@@ -60,6 +67,11 @@ class StoryResponse(StoryBase):
     id: int
     user_id: int
     created_at: datetime
+    media_variants: Optional[Dict[str, str]] = None
+
+    @field_serializer("media_variants")
+    def serialize_media_variants(self, value):
+        return sign_variants(value)
 
     class Config:
         from_attribute = True
@@ -71,6 +83,7 @@ class UserBase(BaseModel):
     email: EmailStr
     phone: Optional[str] = None
     profile_picture_url: Optional[str] = None
+    profile_picture_variants: Optional[Dict[str, str]] = None
     bio: Optional[str] = Field(None, title="Short Biography", max_length=500)
     location: Optional[str] = None
     date_of_birth: Optional[date] = Field(None, title="Date of Birth")
@@ -89,6 +102,10 @@ class UserBase(BaseModel):
     @field_serializer("profile_picture_url")
     def serialize_profile_picture_url(self, value: str) -> Optional[str]:
         return add_sas_token(value)
+
+    @field_serializer("profile_picture_variants")
+    def serialize_profile_picture_variants(self, value):
+        return sign_variants(value)
     
     class Config:
         from_attribures = True
@@ -111,6 +128,7 @@ class UserRelationshipResponse(UserRelationshipBase):
 class UserCreate(UserBase):
     password: str = Field(..., min_length=8, title="Password")
     otp_code: Optional[str]
+    profile_picture_variants: Optional[Dict[str, str]] = Field(None, exclude=True)   # set by the server only
 
 class EmailRequest(BaseModel):
     email_address: EmailStr
@@ -126,6 +144,7 @@ class UserResponse(BaseModel):
     phone: Optional[str]
     created_at: datetime
     profile_picture_url: Optional[str]
+    profile_picture_variants: Optional[Dict[str, str]] = None
     bio: Optional[str]
     location: Optional[str]
     role: Role
@@ -143,6 +162,10 @@ class UserResponse(BaseModel):
     def serialize_profile_picture_url(self, value: str) -> Optional[str]:
         return add_sas_token(value)
 
+    @field_serializer("profile_picture_variants")
+    def serialize_profile_picture_variants(self, value):
+        return sign_variants(value)
+
     class Config:
         from_attributes = True
 
@@ -169,6 +192,10 @@ class UserUpdate(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     id: Optional[int] = None
@@ -176,6 +203,22 @@ class TokenData(BaseModel):
 class TokenWithUser(Token):
     user: UserResponse
 
+# Core user fields only: no stories and no signed URLs, fetch those from /users/{id}
+class UserSummary(BaseModel):
+    id: int
+    name: str
+    surname: Optional[str]
+    email: EmailStr
+    role: Role
+    is_active: bool
+    is_premium: bool
+
+    class Config:
+        from_attributes = True
+
+class TokenWithUserSummary(Token):
+    user: UserSummary
+
 # TODO fix a wavy line
 class Like(BaseModel):
     post_id: int
@@ -189,8 +232,8 @@ class BreedBase(BaseModel):
     pet_type_id: int
 
     @field_serializer("image_url")
-    def serialize_profile_picture_url(self, value: str) -> Optional[str]:
-        return add_sas_token(value)
+    def serialize_image_url(self, value: str) -> Optional[str]:
+        return public_url(value)
 
     class Config:
         from_attribures = True
@@ -231,6 +274,7 @@ class PetBase(BaseModel):
     breed_2_id: Optional[int] = None
     gender: Optional[str] = None  # Expecting 'M', 'F', or 'O'
     profile_picture_url: Optional[str] = None
+    profile_picture_variants: Optional[Dict[str, str]] = None
     bio: Optional[str] = None
     date_of_birth: Optional[date] = None
     is_active: Optional[bool] = True
@@ -242,12 +286,16 @@ class PetBase(BaseModel):
     def serialize_profile_picture_url(self, value: str) -> Optional[str]:
         return add_sas_token(value)
 
+    @field_serializer("profile_picture_variants")
+    def serialize_profile_picture_variants(self, value):
+        return sign_variants(value)
+
     class Config:
         from_attributes = True
 
 
 class PetCreate(PetBase):
-    pass
+    profile_picture_variants: Optional[Dict[str, str]] = Field(None, exclude=True)   # set by the server only
 
 class PetResponse(PetBase):
     id: int
@@ -316,9 +364,14 @@ class PostResponse(PostBase):
     is_active: bool
     created_at: datetime
     edited_at: Optional[datetime] = None
+    media_variants: Optional[Dict[str, str]] = None
     user: UserBase
     pet: PetBase
 
+    @field_serializer("media_variants")
+    def serialize_media_variants(self, value):
+        return sign_variants(value)
+
     class Config:
         from_attributes = True
 
@@ -330,8 +383,8 @@ class AnimalTypeResponse(BaseModel):
     count: int
 
     @field_serializer("image_url")
-    def serialize_profile_picture_url(self, value: str) -> Optional[str]:
-        return add_sas_token(value)
+    def serialize_image_url(self, value: str) -> Optional[str]:
+        return public_url(value)
 
     class Config:
         from_attribute = True
@@ -344,6 +397,10 @@ class PetTypesResponse(BaseModel):
     animal_type_id: int
     count: int
 
+    @field_serializer("image_url")
+    def serialize_image_url(self, value: str) -> Optional[str]:
+        return public_url(value)
+
     class Config:
         from_attribure = True
 
@@ -454,6 +511,27 @@ class PaginatedMessagesResponse(BaseModel):
     model: List[Message]
 
 
+class UploadPurpose(str, Enum):
+    post = "post"
+    story = "story"
+    pet_profile_picture = "pet_profile_picture"
+    user_profile_picture = "user_profile_picture"
+    complaint = "complaint"
+
+
+class DirectUploadRequest(BaseModel):
+    purpose: UploadPurpose
+    file_name: str = Field(..., min_length=1, max_length=200)
+    content_type: str
+
+
+class DirectUploadResponse(BaseModel):
+    upload_url: str           # PUT the file here
+    upload_token: str         # send as `upload_token` when creating the post/story/... instead of the file
+    expires_at: datetime
+    headers: dict             # headers the PUT must carry
+
+
 class EntityType(str, Enum):
     user = "user"
     pet = "pet"
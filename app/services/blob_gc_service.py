@@ -0,0 +1,249 @@
+"""
+Deletes blobs that no record uses any more.
+
+Deletes only enqueue blob URLs (enqueue); the collector started in the app lifespan
+removes them in batches (one blob batch request each on Azure). A reconciliation sweep lists
+user-data/ and enqueues blobs nothing references, catching anything a failed
+request left behind. Both can be run by hand:
+
+    python -m app.services.blob_gc_service
+"""
+import asyncio
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import delete, func, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models
+from ..config import settings
+from ..database import AsyncSessionLocal, async_engine
+from . import metrics_service, storage_service
+from .image_service import IMAGE_VARIANTS
+
+logger = logging.getLogger(__name__)
+
+SWEEP_PREFIX = "user-data/"
+SWEEP_PAGE_SIZE = 1000
+# pg_try_advisory_lock key, so only one worker sweeps at a time
+SWEEP_LOCK_KEY = 0x626c6f62
+# A claimed entry is retried after this when its collector never reports back
+CLAIM_TIMEOUT = timedelta(minutes=10)
+# models.JobRun row recording the last completed sweep
+SWEEP_JOB = "blob_gc_sweep"
+
+# Every column holding a blob URL, each indexed. A blob referenced from any of them is never deleted
+REFERENCE_COLUMNS = (
+    models.Post.media_url,
+    models.Story.media_url,
+    models.User.profile_picture_url,
+    models.Pet.profile_picture_url,
+    models.Complaint.evidence_url,
+    models.Message.media_url,
+    models.AnimalType.image_url,
+    models.PetType.image_url,
+    models.Breed.image_url,
+    models.MediaBlob.blob_url,
+)
+
+# <original blob>.<variant>.<ext>, see image_service.create_variants
+_VARIANT_SUFFIX = re.compile(r"^(.+)\.(%s)\.[a-z]+$" % "|".join(map(re.escape, IMAGE_VARIANTS)))
+
+
+def _owner_url(url: str) -> str:
+    """
+    The URL whose references keep this blob alive: the original for a resized variant, else itself.
+    """
+    match = _VARIANT_SUFFIX.match(url)
+    return match.group(1) if match else url
+
+
+async def enqueue(db: AsyncSession, urls: Iterable[str]):
+    """
+    Queue blobs for deletion as part of the caller's transaction.
+    """
+    rows = [{"blob_url": url} for url in dict.fromkeys(urls) if url]
+    if rows:
+        await db.execute(insert(models.BlobDeletion).values(rows).on_conflict_do_nothing(
+            index_elements=[models.BlobDeletion.blob_url]))
+
+
+async def _referenced(db: AsyncSession, urls: List[str]) -> Set[str]:
+    """
+    The subset of urls that some record still points at, directly or through its original.
+    """
+    owners = {_owner_url(url) for url in urls}
+    query = union_all(*(select(column.label("url")).where(column.in_(list(owners))) for column in REFERENCE_COLUMNS))
+    used = set((await db.execute(query)).scalars())
+    return {url for url in urls if _owner_url(url) in used}
+
+
+def _abandon(url: str, attempts: int, error: Optional[str]):
+    metrics_service.BLOB_DELETIONS_ABANDONED.inc()
+    logger.error(f"Blob GC: giving up on {url} after {attempts} attempts, last error: {error}. "
+                 f"It is dropped from the queue; the sweep queues it again while it stays unreferenced")
+
+
+async def collect_deletions() -> int:
+    """
+    Delete one batch of queued blobs and return the number of queue entries handled.
+
+    The batch is claimed and committed before storage is called, so no row locks are
+    held across the round trip; a collector that dies mid-batch only delays it by CLAIM_TIMEOUT.
+    """
+    batch_size = min(settings.blob_gc_batch_size, storage_service.max_batch_delete())
+    async with AsyncSessionLocal() as db:
+        # SKIP LOCKED lets every worker run a collector without claiming the same batch
+        entries = (await db.execute(
+            select(models.BlobDeletion)
+            .where(models.BlobDeletion.next_attempt_at <= func.now())
+            .order_by(models.BlobDeletion.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )).scalars().all()
+        if not entries:
+            return 0
+
+        in_use = await _referenced(db, [entry.blob_url for entry in entries])
+        claimed = []
+        for entry in entries:
+            if entry.blob_url in in_use:
+                # Re-uploaded or re-attached since it was queued: keep the blob, drop the entry
+                await db.delete(entry)
+            elif entry.attempts >= settings.blob_gc_max_attempts:
+                # Claimed by a collector that never reported back
+                _abandon(entry.blob_url, entry.attempts, entry.last_error)
+                await db.delete(entry)
+            else:
+                entry.attempts += 1
+                entry.next_attempt_at = func.now() + CLAIM_TIMEOUT
+                claimed.append((entry.id, entry.blob_url, entry.attempts))
+        await db.commit()
+
+    if not claimed:
+        return len(entries)
+    errors = await storage_service.delete_blobs(
+        [storage_service.blob_name_from_url(url) for _, url, _ in claimed])
+
+    failed = 0
+    async with AsyncSessionLocal() as db:
+        deleted = [entry_id for (entry_id, _, _), error in zip(claimed, errors) if error is None]
+        if deleted:
+            await db.execute(delete(models.BlobDeletion).where(models.BlobDeletion.id.in_(deleted)))
+        for (entry_id, url, attempts), error in zip(claimed, errors):
+            if error is None:
+                continue
+            failed += 1
+            if attempts >= settings.blob_gc_max_attempts:
+                _abandon(url, attempts, error)
+                await db.execute(delete(models.BlobDeletion).where(models.BlobDeletion.id == entry_id))
+            else:
+                retry_in = timedelta(seconds=settings.blob_gc_interval_seconds * 2 ** attempts)
+                await db.execute(update(models.BlobDeletion).where(models.BlobDeletion.id == entry_id)
+                                 .values(last_error=error, next_attempt_at=func.now() + retry_in))
+        await db.commit()
+
+    if failed:
+        logger.warning(f"{failed} of {len(claimed)} blob deletions failed")
+    logger.info(f"Blob GC: deleted {len(claimed) - failed} blobs, kept {len(in_use)} still in use")
+    return len(entries)
+
+
+async def collect_all() -> int:
+    handled = 0
+    while True:
+        count = await collect_deletions()
+        handled += count
+        if count < min(settings.blob_gc_batch_size, storage_service.max_batch_delete()):
+            return handled
+
+
+async def _enqueue_unreferenced(page: Dict[str, str]) -> int:
+    async with AsyncSessionLocal() as db:
+        orphans = set(page) - await _referenced(db, list(page))
+        await enqueue(db, sorted(orphans))
+        await db.commit()
+    return len(orphans)
+
+
+async def reconcile(interval: Optional[timedelta] = None) -> int:
+    """
+    Enqueue every blob under user-data/ older than the grace period that no record references.
+    With an interval, only sweeps when the last sweep by any worker finished longer ago than that.
+    Returns the number enqueued, or -1 when another worker is already sweeping or it isn't due.
+    """
+    async with async_engine.connect() as lock_connection:
+        if not (await lock_connection.execute(select(func.pg_try_advisory_lock(SWEEP_LOCK_KEY)))).scalar():
+            return -1
+        if interval is not None:
+            last_run = (await lock_connection.execute(
+                select(models.JobRun.last_run_at).where(models.JobRun.name == SWEEP_JOB))).scalar()
+            if last_run is not None and datetime.now(timezone.utc) - last_run < interval:
+                await lock_connection.execute(select(func.pg_advisory_unlock(SWEEP_LOCK_KEY)))
+                await lock_connection.commit()
+                return -1
+        # The lock is held by the session, not the transaction; don't sit idle in one while listing
+        await lock_connection.commit()
+        try:
+            # Younger blobs may belong to an upload that is not attached to its record yet
+            cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.blob_gc_min_age_hours)
+            listed = enqueued = 0
+            page: Dict[str, str] = {}
+            async for blob in storage_service.list_blobs(SWEEP_PREFIX):
+                listed += 1
+                if blob.last_modified and blob.last_modified > cutoff:
+                    continue
+                page[storage_service.blob_url(blob.name)] = blob.name
+                if len(page) >= SWEEP_PAGE_SIZE:
+                    enqueued += await _enqueue_unreferenced(page)
+                    page = {}
+            if page:
+                enqueued += await _enqueue_unreferenced(page)
+
+            await lock_connection.execute(insert(models.JobRun).values(name=SWEEP_JOB, last_run_at=func.now())
+                                          .on_conflict_do_update(index_elements=[models.JobRun.name],
+                                                                 set_={"last_run_at": func.now()}))
+            await lock_connection.commit()
+        finally:
+            await lock_connection.execute(select(func.pg_advisory_unlock(SWEEP_LOCK_KEY)))
+            await lock_connection.commit()
+
+    logger.info(f"Blob GC sweep: listed {listed} blobs under {SWEEP_PREFIX}, enqueued {enqueued} unreferenced")
+    return enqueued
+
+
+async def keep_collecting():
+    """
+    Background task (started in the app lifespan) draining the deletion queue and
+    running the reconciliation sweep every blob_gc_sweep_interval_hours. The last sweep
+    time is kept in the database, so restarts neither postpone nor repeat it.
+    """
+    while True:
+        await asyncio.sleep(settings.blob_gc_interval_seconds)
+        try:
+            await collect_all()
+        except Exception as e:
+            logger.error(f"Blob GC batch failed: {e}")
+
+        if settings.blob_gc_sweep_interval_hours:
+            try:
+                await reconcile(timedelta(hours=settings.blob_gc_sweep_interval_hours))
+            except Exception as e:
+                logger.error(f"Blob GC sweep failed: {e}")
+
+
+async def _main():
+    await storage_service.start_storage()
+    try:
+        print(f"Enqueued {await reconcile()} unreferenced blobs")
+        print(f"Handled {await collect_all()} queued deletions")
+    finally:
+        await storage_service.close_storage()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException, status
+from jose import JWTError, jwt
+from sqlalchemy.dialects.postgresql import insert
+
+from .. import models, schemas
+from ..config import settings
+from ..database import AsyncSessionLocal
+from . import storage_service, upload_policy_service
+
+UPLOAD_TOKEN_TYPE = "upload"
+
+
+def issue_upload(user_id: int, request: schemas.DirectUploadRequest) -> schemas.DirectUploadResponse:
+    """
+    Generate a blob name and a short-lived SAS that only allows writing that blob.
+    The returned upload_token is what the client hands back when creating the record.
+    """
+    upload_policy_service.check_declared_type(request.purpose, request.content_type)
+    blob_name = storage_service.new_blob_name(request.file_name)
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.direct_upload_sas_minutes)
+    blob_url = storage_service.blob_url(blob_name)
+
+    upload_token = jwt.encode({
+        "type": UPLOAD_TOKEN_TYPE,
+        "user_id": user_id,
+        "purpose": request.purpose.value,
+        "blob_name": blob_name,
+        # Finalizing may come a little after the SAS expires, e.g. after a slow upload
+        "exp": expires_at + timedelta(minutes=settings.direct_upload_sas_minutes),
+    }, settings.secret_key, algorithm=settings.algorithm)
+
+    return schemas.DirectUploadResponse(
+        upload_url=f"{blob_url}?{storage_service.create_blob_upload_sas(blob_name, expires_at)}",
+        upload_token=upload_token,
+        expires_at=expires_at,
+        headers=storage_service.upload_headers(request.content_type),
+    )
+
+
+async def finalize_upload(upload_token: str, user_id: int, purpose: schemas.UploadPurpose):
+    """
+    Check the token belongs to this user and purpose and that the blob was uploaded,
+    then mark it used; each token finalizes one record.
+    Returns the blob URL to store on the record and the blob's properties.
+    """
+    invalid = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired upload token")
+    try:
+        claims = jwt.decode(upload_token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        raise invalid
+    if claims.get("type") != UPLOAD_TOKEN_TYPE or claims.get("user_id") != user_id or claims.get("purpose") != purpose.value:
+        raise invalid
+
+    blob_name = claims["blob_name"]
+    properties = await storage_service.get_blob_properties(blob_name)
+    if properties is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File was not uploaded")
+
+    if properties.size > settings.direct_upload_max_bytes:
+        await storage_service.delete_blob(blob_name)
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"File is larger than {settings.direct_upload_max_bytes} bytes")
+    await upload_policy_service.check_stored_blob(purpose, blob_name, properties.size, properties.content_type)
+
+    # Only the first of concurrent finalizes gets the row
+    async with AsyncSessionLocal() as db:
+        consumed = (await db.execute(
+            insert(models.ConsumedUpload)
+            .values(blob_name=blob_name, expires_at=datetime.fromtimestamp(claims["exp"], timezone.utc))
+            .on_conflict_do_nothing(index_elements=[models.ConsumedUpload.blob_name])
+            .returning(models.ConsumedUpload.blob_name)
+        )).first()
+        await db.commit()
+    if consumed is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload token was already used")
+
+    return storage_service.blob_url(blob_name), properties
@@ -1,16 +1,20 @@
 import smtplib
 from email.mime.text import MIMEText
 from app.config import settings
+from app.services import metrics_service
+from app.services.tracing_service import traced
 
+@traced("smtp.send_email")
 def send_email(subject: str, body: str, recipients: list):
     msg = MIMEText(body)
     msg['Subject'] = subject
     msg['From'] = settings.email_sender
     msg['To'] = ', '.join(recipients)
     
-    with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp_server:
-        smtp_server.login(settings.email_sender, settings.email_password)
-        smtp_server.sendmail(settings.email_sender, recipients, msg.as_string())
+    with metrics_service.SMTP_SEND_SECONDS.time():
+        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp_server:
+            smtp_server.login(settings.email_sender, settings.email_password)
+            smtp_server.sendmail(settings.email_sender, recipients, msg.as_string())
     print("Message sent!")
 
 def send_verification_email(email: str, code: str):
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from ..config import settings
+from ..utils.image_variants import CONTENT_TYPES, render_variants
+from . import metrics_service, storage_service
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels; stored on the record as {name: url}
+IMAGE_VARIANTS = {"thumb": 128, "small": 480, "medium": 1080}
+SOURCE_CONTENT_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif", "image/bmp", "image/tiff"}
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def start_image_pool():
+    """
+    Started from the app lifespan. Decoding and resizing are CPU-bound, so they run
+    in separate processes instead of holding the GIL in the API workers.
+    """
+    global _pool
+    # spawn: forking a process that already runs threads and an event loop is unsafe
+    _pool = ProcessPoolExecutor(max_workers=settings.image_processing_workers,
+                                mp_context=multiprocessing.get_context("spawn"))
+
+
+def stop_image_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def wants_variants(content_type: Optional[str], size: int) -> bool:
+    return (_pool is not None and content_type in SOURCE_CONTENT_TYPES
+            and 0 < size <= settings.image_variant_max_source_bytes)
+
+
+async def create_variants(original_url: str, data: bytes) -> Optional[Dict[str, str]]:
+    """
+    Render IMAGE_VARIANTS of an uploaded image and store them next to the original
+    as <original blob>.<variant>.<ext>. Returns {variant: url}, or None if the image
+    couldn't be processed (clients then fall back to the original).
+    """
+    image_format = settings.image_variant_format.upper()
+    content_type = CONTENT_TYPES[image_format]
+    extension = "jpg" if image_format == "JPEG" else image_format.lower()
+
+    start = time.perf_counter()
+    try:
+        rendered = await asyncio.get_running_loop().run_in_executor(
+            _pool, render_variants, data, IMAGE_VARIANTS, image_format, settings.image_variant_quality)
+    except Exception as e:
+        logger.warning(f"Could not create image variants for {original_url}: {e}")
+        return None
+    metrics_service.IMAGE_VARIANT_SECONDS.observe(time.perf_counter() - start)
+
+    blob_name = storage_service.blob_name_from_url(original_url)
+    urls = await asyncio.gather(*(
+        storage_service.upload_blob_bytes(f"{blob_name}.{name}.{extension}", body, content_type)
+        for name, body in rendered.items()
+    ))
+    return dict(zip(rendered, urls))
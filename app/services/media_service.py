@@ -0,0 +1,202 @@
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+
+from .. import models
+from ..database import AsyncSessionLocal
+from ..utils.file_signatures import SNIFF_BYTES, UNDECLARED_TYPE, sniff
+from . import blob_gc_service, image_service, storage_service
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadedMedia(NamedTuple):
+    url: str
+    variants: Optional[Dict[str, str]] = None   # resized copies, see image_service.IMAGE_VARIANTS
+
+
+class _HashingReader:
+    """
+    Wraps the file a storage backend uploads from and hashes the bytes as it reads
+    them, so the content hash costs no pass of its own. Bytes read again after a
+    seek back are not hashed twice.
+    """
+
+    def __init__(self, file_data):
+        self._file = file_data
+        self._digest = hashlib.sha256()
+        self._hashed = 0    # bytes [0, _hashed) are in the digest
+
+    def read(self, size: int = -1) -> bytes:
+        position = self._file.tell()
+        data = self._file.read(size)
+        if position <= self._hashed < position + len(data):
+            self._digest.update(data[self._hashed - position:])
+            self._hashed = position + len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def hexdigest(self) -> str:
+        """
+        Digest of the whole file; hashes whatever the upload did not read through read().
+        """
+        self._file.seek(self._hashed)
+        while chunk := self.read(HASH_CHUNK_SIZE):
+            pass
+        self._file.seek(0)
+        return self._digest.hexdigest()
+
+
+def _sniff_file(file_data) -> str:
+    file_data.seek(0)
+    head = file_data.read(SNIFF_BYTES)
+    file_data.seek(0)
+    return sniff(head) or UNDECLARED_TYPE
+
+
+async def _claim_existing(content_hash: str):
+    """
+    Take a reference on an already stored blob with this hash, if any.
+    """
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            update(models.MediaBlob)
+            .where(models.MediaBlob.content_hash == content_hash)
+            .values(ref_count=models.MediaBlob.ref_count + 1)
+            .returning(models.MediaBlob.blob_url, models.MediaBlob.variants)
+        )).first()
+        await db.commit()
+        return row
+
+
+async def _set_variants(content_hash: str, variants: Dict[str, str]):
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(models.MediaBlob)
+                         .where(models.MediaBlob.content_hash == content_hash)
+                         .values(variants=variants))
+        await db.commit()
+
+
+async def store_upload(file: UploadFile, with_variants: bool = True) -> UploadedMedia:
+    """
+    Store an uploaded file, reusing the existing blob (and its variants) when the
+    same bytes were uploaded before. Every call takes one reference on the blob;
+    give it back with release() when the record using it goes away.
+
+    The file is hashed while it is uploaded, so a duplicate is only recognized
+    afterwards: its copy is then queued for deletion and the stored one is used.
+    """
+    # The stored type is the sniffed one: the declared one is only the client's word
+    content_type = await run_in_threadpool(_sniff_file, file.file)
+    wants_variants = with_variants and image_service.wants_variants(content_type, file.size or 0)
+
+    reader = _HashingReader(file.file)
+    url = await storage_service.upload_file_to_blob(reader, file.filename, content_type)
+    content_hash = await run_in_threadpool(reader.hexdigest)
+
+    existing = await _claim_existing(content_hash)
+    if existing is not None:
+        await _discard(url, None)
+        url, variants = existing
+        if wants_variants and not variants:
+            variants = await image_service.create_variants(url, await file.read())
+            if variants:
+                await _set_variants(content_hash, variants)
+        return UploadedMedia(url, variants if with_variants else None)
+
+    variants = None
+    if wants_variants:
+        variants = await image_service.create_variants(url, await file.read())
+
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            insert(models.MediaBlob)
+            .values(content_hash=content_hash, blob_url=url, size=file.size or 0,
+                    content_type=content_type, variants=variants, ref_count=1)
+            .on_conflict_do_update(index_elements=[models.MediaBlob.content_hash],
+                                   set_={"ref_count": models.MediaBlob.ref_count + 1})
+            .returning(models.MediaBlob.blob_url, models.MediaBlob.variants)
+        )).first()
+        await db.commit()
+
+    if row.blob_url != url:
+        # Someone stored the same file at the same time: use theirs, drop ours
+        await _discard(url, variants)
+        return UploadedMedia(row.blob_url, row.variants if with_variants else None)
+    return UploadedMedia(url, variants)
+
+
+def _with_variants(url: str, variants: Optional[Dict[str, str]]) -> List[str]:
+    return [url, *(variants or {}).values()]
+
+
+async def _discard(url: str, variants: Optional[Dict[str, str]]):
+    async with AsyncSessionLocal() as db:
+        await blob_gc_service.enqueue(db, _with_variants(url, variants))
+        await db.commit()
+
+
+async def release(url: Optional[str], variants: Optional[Dict[str, str]] = None):
+    """
+    Drop one reference to a stored blob, queueing it (and its variants) for
+    deletion when it was the last. URLs not in the index (uploaded before it
+    existed, or direct uploads) are queued together with the record's variants;
+    the collector keeps any blob another record still points at.
+    """
+    if not url:
+        return
+
+    async with AsyncSessionLocal() as db:
+        indexed = (await db.execute(
+            update(models.MediaBlob)
+            .where(models.MediaBlob.blob_url == url)
+            .values(ref_count=models.MediaBlob.ref_count - 1)
+            .returning(models.MediaBlob.ref_count)
+        )).first()
+        if indexed is None:
+            await blob_gc_service.enqueue(db, _with_variants(url, variants))
+        else:
+            # A concurrent store_upload that re-claims the row first keeps it alive
+            deleted = (await db.execute(
+                delete(models.MediaBlob)
+                .where(models.MediaBlob.blob_url == url, models.MediaBlob.ref_count <= 0)
+                .returning(models.MediaBlob.variants)
+            )).first()
+            if deleted is not None:
+                await blob_gc_service.enqueue(db, _with_variants(url, deleted.variants))
+        await db.commit()
+
+
+async def release_all(media: Iterable[Tuple[Optional[str], Optional[Dict[str, str]]]]):
+    """
+    release() each (url, variants) pair, e.g. the media of rows removed by an ON DELETE CASCADE.
+    """
+    for url, variants in media:
+        await release(url, variants)
+
+
+@asynccontextmanager
+async def released_on_error(media: Optional[Tuple[Optional[str], Optional[Dict[str, str]]]]):
+    """
+    Wrap the commit that attaches freshly stored media to its record: if it fails,
+    the reference store_upload()/resolve_upload() took is given back, e.g.
+
+        async with media_service.released_on_error(picture):
+            db.commit()
+    """
+    try:
+        yield
+    except BaseException:
+        if media:
+            await release(*media)
+        raise
@@ -0,0 +1,138 @@
+import time
+
+from fastapi import Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from ..utils.pool_metrics import get_pool_stats
+from ..utils.query_counter import current_stats
+from ..utils.security_utils import password_hasher
+
+# Metrics are per worker process; scrape each worker (or run with PROMETHEUS_MULTIPROC_DIR)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route",
+    ["method", "route"],
+)
+REQUEST_COUNT = Counter(
+    "http_requests_total", "Requests by route and status code",
+    ["method", "route", "status"],
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request",
+    ["method", "route"],
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100, 200),
+)
+
+BLOB_UPLOAD_SECONDS = Histogram(
+    "blob_upload_duration_seconds", "Blob upload duration",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+BLOB_UPLOAD_THROUGHPUT = Histogram(
+    "blob_upload_throughput_bytes_per_second", "Blob upload throughput",
+    ["mode"],
+    buckets=(256e3, 1e6, 4e6, 16e6, 32e6, 64e6, 128e6, 256e6),
+)
+IMAGE_VARIANT_SECONDS = Histogram(
+    "image_variant_render_seconds", "Time to decode an upload and encode its resized variants",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
+)
+BLOB_UPLOAD_BYTES = Counter("blob_upload_bytes_total", "Bytes uploaded to blob storage")
+SAS_TOKENS_GENERATED = Counter("sas_tokens_generated_total", "Container SAS tokens generated")
+BLOB_DELETIONS_ABANDONED = Counter(
+    "blob_deletions_abandoned_total", "Queued blob deletions dropped after blob_gc_max_attempts failures",
+)
+
+SMTP_SEND_SECONDS = Histogram(
+    "smtp_send_duration_seconds", "Time to send one email over SMTP",
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+
+RATE_LIMITED = Counter(
+    "rate_limited_requests_total", "Requests rejected by a rate limit policy",
+    ["policy", "scope"],
+)
+
+UPLOADS_REJECTED = Counter(
+    "uploads_rejected_total", "Uploads rejected for their size (413) or file type (415)",
+    ["policy", "status"],
+)
+
+WEBSOCKET_CONNECTIONS = Gauge("websocket_active_connections", "Open messaging websocket connections")
+
+
+class _PoolCollector:
+    """
+    Reads the pool counters from utils.pool_metrics at scrape time.
+    """
+
+    def collect(self):
+        gauges = {
+            "checked_out": GaugeMetricFamily("db_pool_checked_out", "Connections currently checked out", labels=["pool"]),
+            "checked_in": GaugeMetricFamily("db_pool_checked_in", "Idle connections in the pool", labels=["pool"]),
+            "overflow": GaugeMetricFamily("db_pool_overflow", "Overflow connections (negative while below pool_size)", labels=["pool"]),
+            "pool_size": GaugeMetricFamily("db_pool_size", "Configured pool size", labels=["pool"]),
+        }
+        counters = {
+            "checkouts_total": CounterMetricFamily("db_pool_checkouts", "Connection checkouts", labels=["pool"]),
+            "timeouts": CounterMetricFamily("db_pool_timeouts", "Checkouts that timed out", labels=["pool"]),
+            "invalidations": CounterMetricFamily("db_pool_invalidations", "Invalidated connections", labels=["pool"]),
+            "wait_seconds_total": CounterMetricFamily("db_pool_wait_seconds", "Time spent waiting for a connection", labels=["pool"]),
+        }
+        for pool, stats in get_pool_stats().items():
+            for key, family in {**gauges, **counters}.items():
+                if key in stats:
+                    family.add_metric([pool], stats[key])
+        yield from gauges.values()
+        yield from counters.values()
+
+
+REGISTRY.register(_PoolCollector())
+
+
+class _PasswordHasherCollector:
+    """
+    Queue depth and totals of the password hashing executor (utils.password_hasher).
+    """
+
+    def collect(self):
+        yield GaugeMetricFamily("password_hash_queue_depth", "Hashing calls waiting for a worker",
+                                value=password_hasher.queue_depth)
+        yield GaugeMetricFamily("password_hash_pending", "Hashing calls queued or running",
+                                value=password_hasher.pending)
+        yield GaugeMetricFamily("password_hash_workers", "Password hashing worker threads",
+                                value=password_hasher.workers)
+        stats = password_hasher.stats
+        yield CounterMetricFamily("password_hash_completed", "Hashing calls completed", value=stats["completed"])
+        yield CounterMetricFamily("password_hash_rejected", "Hashing calls rejected because the queue was full",
+                                  value=stats["rejected"])
+        yield CounterMetricFamily("password_hash_rehashed", "Passwords rehashed on login after a cost change",
+                                  value=stats["rehashed"])
+        yield CounterMetricFamily("password_hash_wait_seconds", "Time spent queued before hashing",
+                                  value=stats["wait_seconds_total"])
+        yield CounterMetricFamily("password_hash_seconds", "Time spent hashing", value=stats["hash_seconds_total"])
+
+
+REGISTRY.register(_PasswordHasherCollector())
+
+
+async def metrics_middleware(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        # Label by route template, never the raw path, to keep label cardinality bounded
+        route_path = route.path if route else "unmatched"
+        REQUEST_LATENCY.labels(request.method, route_path).observe(time.perf_counter() - start)
+        REQUEST_COUNT.labels(request.method, route_path, str(status_code)).inc()
+        stats = current_stats()
+        if stats is not None:
+            REQUEST_DB_QUERIES.labels(request.method, route_path).observe(stats.count)
+
+
+def metrics_response() -> Response:
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,198 @@
+import logging
+import math
+import re
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse
+
+from .. import oauth2
+from ..config import settings
+from ..utils.rate_limiter import MemoryBackend, RedisBackend, TokenBucketBackend
+from .metrics_service import RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+
+class Limit:
+    """
+    A token bucket: bursts of up to `capacity` requests, refilled at
+    `capacity` per `period_seconds`.
+
+    scope is what the bucket is keyed on:
+      "ip"      - client address
+      "user"    - authenticated user id (route must require a valid token)
+      "account" - the email/username submitted in the form together with the client
+                  address, for unauthenticated routes. Keyed on the account alone, anyone
+                  could lock someone else out by failing their login on purpose.
+    """
+
+    def __init__(self, scope: str, capacity: int, period_seconds: float):
+        self.scope = scope
+        self.capacity = capacity
+        self.refill_per_second = capacity / period_seconds
+
+
+POLICIES: Dict[str, List[Limit]] = {
+    # Credential stuffing: cap per address and per account tried from that address
+    "auth.login": [Limit("ip", 20, 60), Limit("account", 5, 60)],
+    # Each call opens an SMTP connection
+    "user.send_verification_email": [Limit("ip", 5, 600), Limit("account", 3, 600)],
+    "post.create_posts": [Limit("user", 10, 60), Limit("ip", 30, 60)],
+    "story.create_story": [Limit("user", 10, 60), Limit("ip", 30, 60)],
+}
+
+# Upload routes are limited in rate_limit_middleware instead of a dependency: dependencies
+# only run once FastAPI has read and spooled the whole multipart body
+ROUTE_POLICIES: List[Tuple[str, Pattern, str]] = [
+    ("POST", re.compile(r"^/posts/?$"), "post.create_posts"),
+    ("POST", re.compile(r"^/stories/?$"), "story.create_story"),
+]
+
+
+def _redis_backend() -> TokenBucketBackend:
+    if not settings.rate_limit_redis_url:
+        raise ValueError("rate_limit_redis_url must be set to use the redis rate limit backend")
+    return RedisBackend(settings.rate_limit_redis_url)
+
+
+_backends: Dict[str, Callable[[], TokenBucketBackend]] = {
+    "memory": MemoryBackend,
+    "redis": _redis_backend,
+}
+
+
+def register_backend(name: str, factory: Callable[[], TokenBucketBackend]):
+    """
+    Make another shared store selectable through settings.rate_limit_backend.
+    """
+    global _backend
+    _backends[name] = factory
+    _backend = None
+
+
+_backend: Optional[TokenBucketBackend] = None
+
+
+def get_backend() -> TokenBucketBackend:
+    global _backend
+    if _backend is None:
+        if settings.rate_limit_backend not in _backends:
+            raise ValueError(f"Unknown rate limit backend '{settings.rate_limit_backend}', "
+                             f"choose one of {sorted(_backends)}")
+        _backend = _backends[settings.rate_limit_backend]()
+    return _backend
+
+
+def _strip_port(address: str) -> str:
+    # App Service appends "ip:port"; IPv6 comes bare or as "[ip]:port"
+    if address.startswith("["):
+        return address[1:].split("]", 1)[0]
+    if address.count(":") == 1:
+        return address.split(":", 1)[0]
+    return address
+
+
+def client_ip(request: Request) -> str:
+    """
+    The caller's address. Behind trusted proxies this is the X-Forwarded-For entry
+    appended by the outermost of them: entries further left come from the client
+    and can say anything.
+    """
+    if settings.rate_limit_trust_forwarded_for:
+        forwarded = ",".join(request.headers.getlist("x-forwarded-for"))
+        entries = [entry.strip() for entry in forwarded.split(",") if entry.strip()]
+        hops = settings.rate_limit_forwarded_for_hops
+        if hops > 0 and len(entries) >= hops:
+            return _strip_port(entries[-hops])
+    return request.client.host if request.client else "unknown"
+
+
+async def _submitted_account(request: Request) -> Optional[str]:
+    # Starlette caches the parsed form, so the route still gets its fields
+    form = await request.form()
+    account = form.get("username") or form.get("email")
+    return account.strip().lower() if isinstance(account, str) and account.strip() else None
+
+
+async def _check(policy_name: str, request: Request, user_id: Optional[int]):
+    if not settings.rate_limit_enabled:
+        return
+
+    limits, buckets = [], []
+    for limit in POLICIES[policy_name]:
+        if limit.scope == "ip":
+            key = client_ip(request)
+        elif limit.scope == "user":
+            key = user_id
+        else:
+            account = await _submitted_account(request)
+            key = f"{client_ip(request)}:{account}" if account else None
+        if key is None:
+            continue
+        limits.append(limit)
+        buckets.append((f"{policy_name}:{limit.scope}:{key}", limit.capacity, limit.refill_per_second))
+    if not buckets:
+        return
+
+    try:
+        # Nothing is debited unless every bucket allows the request, so rejected
+        # requests don't drain the other buckets and stretch the lockout
+        waits = await get_backend().take_all(buckets)
+    except Exception as e:
+        # A broken shared store must not take the API down with it
+        logger.warning(f"Rate limit backend failed, allowing request: {e}")
+        return
+    for limit, wait in zip(limits, waits):
+        if wait > 0:
+            RATE_LIMITED.labels(policy_name, limit.scope).inc()
+
+    retry_after = max(waits)
+    if retry_after > 0:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                            detail="Too many requests, try again later",
+                            headers={"Retry-After": str(math.ceil(retry_after))})
+
+
+def _bearer_user_id(request: Request) -> Optional[int]:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return oauth2.verify_access_token(token, HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)).id
+    except HTTPException:
+        # The route rejects the token itself; only the ip limit applies here
+        return None
+
+
+async def rate_limit_middleware(request: Request, call_next):
+    """
+    Enforces ROUTE_POLICIES before the request body is read.
+    """
+    for method, pattern, policy_name in ROUTE_POLICIES:
+        if request.method == method and pattern.match(request.url.path):
+            user_id = _bearer_user_id(request) if any(limit.scope == "user" for limit in POLICIES[policy_name]) else None
+            try:
+                await _check(policy_name, request, user_id)
+            except HTTPException as e:
+                return JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=e.headers)
+            break
+    return await call_next(request)
+
+
+def rate_limit(policy_name: str) -> Callable:
+    """
+    Dependency enforcing POLICIES[policy_name], e.g.
+    `dependencies=[Depends(rate_limit_service.rate_limit("auth.login"))]`.
+    """
+    if policy_name not in POLICIES:
+        raise ValueError(f"Unknown rate limit policy '{policy_name}'")
+
+    if any(limit.scope == "user" for limit in POLICIES[policy_name]):
+        async def dependency(request: Request, user_id: int = Depends(oauth2.get_current_user_id)):
+            await _check(policy_name, request, user_id)
+    else:
+        async def dependency(request: Request):
+            await _check(policy_name, request, None)
+
+    return dependency
@@ -0,0 +1,71 @@
+"""
+Moves reference images (animal types, pet types, breeds) into the public storage area.
+
+    python -m app.services.reference_media_service
+
+Rows whose image_url already points at the public area are skipped, so it is safe to rerun.
+"""
+import asyncio
+import logging
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..config import settings
+from ..database import SessionLocal
+from .storage_service import blob_name_from_url, close_storage, get_backend, is_public, start_storage
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_MODELS = (models.AnimalType, models.PetType, models.Breed)
+
+
+async def publish_blob(url: str) -> str:
+    """
+    Copy a private blob into the public area with long-lived cache headers
+    and return its new URL.
+    """
+    backend = get_backend()
+    blob_name = blob_name_from_url(url)
+    properties = await backend.get_properties(blob_name)
+
+    return await backend.upload(
+        f"reference/{blob_name.rsplit('/', 1)[-1]}",
+        await backend.download(blob_name),
+        properties.content_type,
+        cache_control=settings.reference_media_cache_control,
+        public=True,
+    )
+
+
+async def publish_reference_media(db: Session) -> int:
+    if get_backend().public_base_url is None:
+        raise ValueError("The storage backend has no public area (azure: set azure_storage_public_container_name)")
+
+    await get_backend().create_containers()
+
+    published = 0
+    for model in REFERENCE_MODELS:
+        for row in db.query(model).filter(model.image_url.isnot(None)).all():
+            if is_public(row.image_url):
+                continue
+            row.image_url = await publish_blob(row.image_url)
+            db.commit()
+            published += 1
+            logger.info(f"Published {model.__tablename__} {row.id}: {row.image_url}")
+    return published
+
+
+async def _main():
+    await start_storage()
+    db = SessionLocal()
+    try:
+        print(f"Published {await publish_reference_media(db)} reference images")
+    finally:
+        db.close()
+        await close_storage()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
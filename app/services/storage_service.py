@@ -0,0 +1,301 @@
+"""
+Media storage for the app, on the backend selected by settings.storage_backend:
+
+    azure  - Azure Blob Storage (utils/azure_blob_backend.py)
+    local  - files under storage_local_path, served by routers/storage.py
+    memory - per-process dict, served by routers/storage.py; tests and load tests
+
+Nothing talks to the storage service before start_storage() (app lifespan),
+so the app can be imported without credentials for a backend it doesn't use.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import AsyncIterator, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from fastapi import Request
+
+from ..config import settings
+from ..utils.storage_backends import BlobInfo, LocalStorageBackend, MemoryStorageBackend, StorageBackend, stream_size
+from . import metrics_service
+from .tracing_service import traced
+
+logger = logging.getLogger(__name__)
+
+
+class StorageClass(str, Enum):
+    # Private area, every URL handed out carries a SAS
+    USER_CONTENT = "user"
+    # Same for every user: public-read area, unsigned long-cacheable URLs
+    REFERENCE = "reference"
+
+
+def _azure_backend() -> StorageBackend:
+    if not (settings.azure_storage_connection_string and settings.azure_storage_account_key
+            and settings.azure_storage_container_name):
+        raise ValueError("azure_storage_connection_string, azure_storage_account_key and "
+                         "azure_storage_container_name must be set to use the azure storage backend")
+    # Optional dependency, only needed when this backend is selected
+    from ..utils.azure_blob_backend import AzureBlobBackend
+
+    return AzureBlobBackend(
+        settings.azure_storage_connection_string,
+        settings.azure_storage_account_key,
+        settings.azure_storage_container_name,
+        public_container_name=settings.azure_storage_public_container_name,
+        max_connections=settings.azure_storage_max_connections,
+        block_threshold=settings.blob_block_upload_threshold,
+        block_size=settings.blob_upload_block_size,
+        max_concurrency=settings.blob_upload_max_concurrency,
+    )
+
+
+def _local_backend() -> StorageBackend:
+    return LocalStorageBackend(settings.storage_local_path, settings.storage_base_url,
+                               settings.secret_key, settings.storage_latency_ms)
+
+
+def _memory_backend() -> StorageBackend:
+    return MemoryStorageBackend(settings.storage_base_url, settings.secret_key, settings.storage_latency_ms)
+
+
+_backends: Dict[str, Callable[[], StorageBackend]] = {
+    "azure": _azure_backend,
+    "local": _local_backend,
+    "memory": _memory_backend,
+}
+
+
+def register_backend(name: str, factory: Callable[[], StorageBackend]):
+    """
+    Make another storage backend selectable through settings.storage_backend.
+    """
+    global _backend
+    _backends[name] = factory
+    _backend = None
+
+
+_backend: Optional[StorageBackend] = None
+
+
+def get_backend() -> StorageBackend:
+    global _backend
+    if _backend is None:
+        if settings.storage_backend not in _backends:
+            raise ValueError(f"Unknown storage backend '{settings.storage_backend}', "
+                             f"choose one of {sorted(_backends)}")
+        _backend = _backends[settings.storage_backend]()
+    return _backend
+
+
+async def start_storage():
+    await get_backend().start()
+
+
+async def close_storage():
+    global _backend, _cached_sas
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+        _cached_sas = None
+
+
+def new_blob_name(file_name: str) -> str:
+    return f"user-data/{uuid.uuid4()}_{os.path.basename(file_name or 'upload')}"
+
+
+def blob_url(blob_name: str) -> str:
+    return get_backend().url(blob_name)
+
+
+def blob_name_from_url(url: str) -> str:
+    return get_backend().blob_name_from_url(url)
+
+
+def create_blob_upload_sas(blob_name: str, expiry_time: datetime) -> str:
+    """
+    SAS allowing a client to create this one blob (no read, no other blobs).
+    """
+    return get_backend().create_upload_sas(blob_name, expiry_time)
+
+
+def upload_headers(content_type: str) -> Dict[str, str]:
+    return get_backend().upload_headers(content_type)
+
+
+async def get_blob_properties(blob_name: str) -> Optional[BlobInfo]:
+    """
+    Properties of a private blob, or None when it does not exist.
+    """
+    return await get_backend().get_properties(blob_name)
+
+
+async def blob_exists(blob_name: str) -> bool:
+    return await get_blob_properties(blob_name) is not None
+
+
+async def upload_blob_bytes(blob_name: str, data: bytes, content_type: str) -> str:
+    return await get_backend().upload(blob_name, data, content_type)
+
+
+async def download_blob(blob_name: str, length: Optional[int] = None) -> bytes:
+    return await get_backend().download(blob_name, length=length)
+
+
+def max_batch_delete() -> int:
+    return get_backend().max_batch_delete
+
+
+async def delete_blobs(blob_names: List[str]) -> List[Optional[str]]:
+    """
+    Delete up to max_batch_delete() blobs in one call. Returns, in order,
+    None for each blob that is gone (deleted or already missing), otherwise the error.
+    """
+    return await get_backend().delete(blob_names)
+
+
+async def delete_blob(blob_name: str):
+    error, = await delete_blobs([blob_name])
+    if error is not None:
+        raise RuntimeError(f"Failed to delete {blob_name}: {error}")
+
+
+def list_blobs(prefix: str) -> AsyncIterator[BlobInfo]:
+    """
+    Async iterator over the private blobs whose names start with prefix.
+    """
+    return get_backend().list(prefix)
+
+
+@traced("storage.upload_blob")
+async def upload_file_to_blob(file_data, file_name, content_type, storage_class: StorageClass = StorageClass.USER_CONTENT):
+    backend = get_backend()
+    public = storage_class == StorageClass.REFERENCE and backend.public_base_url is not None
+    if public:
+        blob_name = f"reference/{uuid.uuid4()}_{file_name}"
+        cache_control = settings.reference_media_cache_control
+    else:
+        blob_name = new_blob_name(file_name)
+        cache_control = None
+    size = stream_size(file_data)
+
+    start = time.perf_counter()
+    url = await backend.upload(blob_name, file_data, content_type, cache_control=cache_control, public=public)
+    elapsed = time.perf_counter() - start
+
+    mode = "blocks" if size > settings.blob_block_upload_threshold else "single"
+    metrics_service.BLOB_UPLOAD_SECONDS.observe(elapsed)
+    metrics_service.BLOB_UPLOAD_BYTES.inc(size)
+    if elapsed > 0:
+        metrics_service.BLOB_UPLOAD_THROUGHPUT.labels(mode).observe(size / elapsed)
+    logger.debug(f"Uploaded {size} bytes to {blob_name} in {elapsed:.2f}s ({mode})")
+
+    return url
+
+
+@traced("storage.generate_read_sas")
+def create_read_sas(expiry_time: datetime = None) -> str:
+    if expiry_time is None:
+        expiry_time = datetime.now(timezone.utc) + timedelta(minutes=settings.sas_token_lifetime_minutes)
+    sas_token = get_backend().create_read_sas(expiry_time)
+    metrics_service.SAS_TOKENS_GENERATED.inc()
+    return sas_token
+
+
+_sas_lock = threading.Lock()
+_cached_sas = None          # (token, expiry)
+
+
+def get_read_sas() -> str:
+    """
+    Cached read SAS for private blobs. A new one is signed once the current token
+    is within sas_token_rotation_margin_minutes of expiry, so every URL handed out
+    stays valid for at least that long and URLs are stable between rotations.
+    """
+    global _cached_sas
+    # A margin as long as the lifetime would re-sign on every call
+    margin = timedelta(minutes=min(settings.sas_token_rotation_margin_minutes,
+                                   settings.sas_token_lifetime_minutes / 2))
+
+    cached = _cached_sas
+    if cached and datetime.now(timezone.utc) < cached[1] - margin:
+        return cached[0]
+
+    with _sas_lock:
+        now = datetime.now(timezone.utc)
+        if not _cached_sas or now >= _cached_sas[1] - margin:
+            expiry = now + timedelta(minutes=settings.sas_token_lifetime_minutes)
+            _cached_sas = (create_read_sas(expiry), expiry)
+        return _cached_sas[0]
+
+
+class SigningContext:
+    """
+    Holds the SAS used for every URL in one response, fetched on first use,
+    so nested serializers don't each go back to the cache (or sign).
+    """
+
+    def __init__(self):
+        self._sas: Optional[str] = None
+
+    @property
+    def sas(self) -> str:
+        if self._sas is None:
+            self._sas = get_read_sas()
+        return self._sas
+
+
+_signing_context: ContextVar[Optional[SigningContext]] = ContextVar("sas_signing_context", default=None)
+
+
+async def signing_context_middleware(request: Request, call_next):
+    token = _signing_context.set(SigningContext())
+    try:
+        return await call_next(request)
+    finally:
+        _signing_context.reset(token)
+
+
+def _is_signed(url: str) -> bool:
+    return "sig" in parse_qs(urlsplit(url).query)
+
+
+# TODO add this for all files
+def add_sas_token(url: str) -> str:
+    """
+    Append the read SAS to a blob URL. URLs that already carry a signature
+    (e.g. signed by a router before the schema serializer sees them) are returned as is.
+    """
+    if not url or _is_signed(url):
+        return url
+
+    context = _signing_context.get()
+    sas = context.sas if context is not None else get_read_sas()
+    separator = "&" if urlsplit(url).query else "?"
+    return f"{url}{separator}{sas}"
+
+
+def is_public(url: str) -> bool:
+    base = get_backend().public_base_url
+    return base is not None and url.startswith(base + "/")
+
+
+def public_url(url: str) -> str:
+    """
+    URL for reference media. Blobs in the public area are returned unsigned,
+    through the CDN when public_media_base_url is set; anything not published
+    there yet is signed like user content so it keeps working.
+    """
+    if not url:
+        return url
+    if not is_public(url):
+        return add_sas_token(url)
+    if settings.public_media_base_url:
+        return settings.public_media_base_url.rstrip("/") + url[len(get_backend().public_base_url):]
+    return url
@@ -0,0 +1,131 @@
+import functools
+import inspect
+import logging
+import os
+from typing import Callable, Dict
+
+from fastapi import Request
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# No-op until setup_tracing() installs a provider, so instrumented code costs almost nothing when disabled
+tracer = trace.get_tracer("app")
+propagator = TraceContextTextMapPropagator()
+
+
+def _file_exporter() -> SpanExporter:
+    log_dir = os.path.dirname(settings.tracing_file_path)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    return ConsoleSpanExporter(
+        out=open(settings.tracing_file_path, "a"),
+        formatter=lambda span: span.to_json(indent=None) + os.linesep,
+    )
+
+
+_exporters: Dict[str, Callable[[], SpanExporter]] = {
+    "console": ConsoleSpanExporter,
+    "file": _file_exporter,
+}
+
+
+def register_exporter(name: str, factory: Callable[[], SpanExporter]):
+    """
+    Make an exporter selectable through `settings.tracing_exporter`, e.g. an OTLP exporter.
+    """
+    _exporters[name] = factory
+
+
+def traced(span_name: str):
+    """
+    Decorator that wraps a sync or async function in a span.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.start_as_current_span(span_name, kind=SpanKind.CLIENT):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(span_name, kind=SpanKind.CLIENT):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    operation = statement.lstrip().split(" ", 1)[0].upper()
+    span = tracer.start_span(
+        f"db {operation}",
+        kind=SpanKind.CLIENT,
+        attributes={"db.system": "postgresql", "db.statement": statement[:2000]},
+    )
+    conn.info.setdefault("trace_spans", []).append(span)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get("trace_spans")
+    if spans:
+        spans.pop().end()
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    spans = conn.info.get("trace_spans") if conn is not None else None
+    if spans:
+        span = spans.pop()
+        span.record_exception(exception_context.original_exception)
+        span.set_status(Status(StatusCode.ERROR))
+        span.end()
+
+
+async def tracing_middleware(request: Request, call_next):
+    """
+    Server span per request, continuing the caller's trace from a W3C `traceparent` header
+    and returning ours in the response.
+    """
+    parent = propagator.extract(request.headers)
+    with tracer.start_as_current_span(
+        f"{request.method} {request.url.path}", context=parent, kind=SpanKind.SERVER
+    ) as span:
+        response = await call_next(request)
+
+        route = request.scope.get("route")
+        if route:
+            span.update_name(f"{request.method} {route.path}")
+            span.set_attribute("http.route", route.path)
+        span.set_attribute("http.method", request.method)
+        span.set_attribute("http.status_code", response.status_code)
+        if response.status_code >= 500:
+            span.set_status(Status(StatusCode.ERROR))
+
+        propagator.inject(response.headers)
+    return response
+
+
+def setup_tracing():
+    exporter_factory = _exporters.get(settings.tracing_exporter)
+    if exporter_factory is None:
+        logger.error(f"Unknown tracing exporter '{settings.tracing_exporter}', tracing disabled")
+        return
+
+    provider = TracerProvider(resource=Resource.create({"service.name": settings.tracing_service_name}))
+    provider.add_span_processor(BatchSpanProcessor(exporter_factory()))
+    trace.set_tracer_provider(provider)
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
@@ -0,0 +1,89 @@
+import re
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from fastapi import HTTPException, status
+
+from ..config import settings
+from ..schemas import UploadPurpose
+from ..utils.file_signatures import DOCUMENT_TYPES, IMAGE_TYPES, SNIFF_BYTES, VIDEO_TYPES, normalize_type
+from ..utils.upload_guard import UploadPolicy
+from . import storage_service
+from .metrics_service import UPLOADS_REJECTED
+
+POLICIES: Dict[UploadPurpose, UploadPolicy] = {
+    UploadPurpose.post: UploadPolicy("post", settings.upload_max_post_bytes, IMAGE_TYPES | VIDEO_TYPES),
+    UploadPurpose.story: UploadPolicy("story", settings.upload_max_story_bytes, IMAGE_TYPES | VIDEO_TYPES),
+    UploadPurpose.user_profile_picture: UploadPolicy("user_profile_picture",
+                                                     settings.upload_max_profile_picture_bytes, IMAGE_TYPES),
+    UploadPurpose.pet_profile_picture: UploadPolicy("pet_profile_picture",
+                                                    settings.upload_max_profile_picture_bytes, IMAGE_TYPES),
+    UploadPurpose.complaint: UploadPolicy("complaint", settings.upload_max_complaint_bytes,
+                                          IMAGE_TYPES | VIDEO_TYPES | DOCUMENT_TYPES),
+}
+
+# Direct upload PUTs to the local/memory storage router don't say what they are for:
+# they get the loosest policy here and the purpose's own policy at finalize_upload
+DIRECT_UPLOAD_POLICY = UploadPolicy(
+    "direct_upload",
+    min(settings.direct_upload_max_bytes, max(policy.max_bytes for policy in POLICIES.values())),
+    frozenset().union(*(policy.allowed_types for policy in POLICIES.values())),
+)
+
+# Routes that receive files, matched on the raw path since the check runs before routing
+ROUTES: List[Tuple[str, Pattern, UploadPolicy]] = [
+    ("POST", re.compile(r"^/posts/?$"), POLICIES[UploadPurpose.post]),
+    ("POST", re.compile(r"^/stories/?$"), POLICIES[UploadPurpose.story]),
+    ("POST", re.compile(r"^/users/?$"), POLICIES[UploadPurpose.user_profile_picture]),
+    ("POST", re.compile(r"^/users/[^/]+/upload-profile-picture/?$"), POLICIES[UploadPurpose.user_profile_picture]),
+    ("POST", re.compile(r"^/pets/?$"), POLICIES[UploadPurpose.pet_profile_picture]),
+    ("POST", re.compile(r"^/pets/[^/]+/upload-profile-picture/?$"), POLICIES[UploadPurpose.pet_profile_picture]),
+    ("POST", re.compile(r"^/complaints/?$"), POLICIES[UploadPurpose.complaint]),
+    ("PUT", re.compile(r"^/storage/private/.+$"), DIRECT_UPLOAD_POLICY),
+]
+
+
+def resolve(method: str, path: str) -> Optional[UploadPolicy]:
+    """
+    Policy for UploadGuardMiddleware, None for requests that carry no file.
+    """
+    if not settings.upload_validation_enabled:
+        return None
+    for route_method, pattern, policy in ROUTES:
+        if method == route_method and pattern.match(path):
+            return policy
+    return None
+
+
+def record_rejection(policy: UploadPolicy, status_code: int):
+    UPLOADS_REJECTED.labels(policy.name, str(status_code)).inc()
+
+
+def check_declared_type(purpose: Optional[UploadPurpose], content_type: Optional[str]):
+    """
+    Refuse a direct upload up front when the client says it is a type the purpose doesn't take.
+    purpose is None for the upload PUT itself, which only gets its purpose at finalize_upload.
+    """
+    policy = DIRECT_UPLOAD_POLICY if purpose is None else POLICIES[purpose]
+    if settings.upload_validation_enabled and normalize_type(content_type) not in policy.allowed_types:
+        record_rejection(policy, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        raise policy.unsupported_type()
+
+
+async def check_stored_blob(purpose: UploadPurpose, blob_name: str, size: int, content_type: Optional[str]):
+    """
+    Apply the purpose's policy to a blob the client uploaded straight to storage,
+    reading only its first bytes; its stored content type must match them.
+    Rejected blobs are deleted.
+    """
+    if not settings.upload_validation_enabled:
+        return
+    policy = POLICIES[purpose]
+    try:
+        if size > policy.max_bytes:
+            raise policy.too_large()
+        head = await storage_service.download_blob(blob_name, length=min(size, SNIFF_BYTES)) if size else b""
+        policy.check_type(head, content_type)
+    except HTTPException as e:
+        record_rejection(policy, e.status_code)
+        await storage_service.delete_blob(blob_name)
+        raise
@@ -0,0 +1,198 @@
+import asyncio
+import base64
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import aiohttp
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.storage.blob import (BlobBlock, BlobClient, BlobSasPermissions, BlobServiceClient, ContainerSasPermissions,
+                                ContentSettings, PublicAccess, generate_blob_sas, generate_container_sas)
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+from fastapi.concurrency import run_in_threadpool
+
+from .storage_backends import BlobInfo, StorageBackend, stream_size
+
+
+async def _stage_block(blob_client, block_id: str, chunk: bytes, slots: asyncio.Semaphore):
+    try:
+        await blob_client.stage_block(block_id, chunk, length=len(chunk))
+    finally:
+        slots.release()
+
+
+async def upload_in_blocks(blob_client, file_data, content_settings: ContentSettings,
+                           block_size: int, max_concurrency: int) -> int:
+    """
+    Read file_data block by block and stage the blocks concurrently, then commit
+    the block list. A block is only read once a staging slot is free, so at most
+    max_concurrency blocks are held in memory. Returns the number of bytes uploaded.
+    """
+    slots = asyncio.Semaphore(max_concurrency)
+    blocks, pending, size = [], set(), 0
+
+    try:
+        while True:
+            await slots.acquire()
+            chunk = await run_in_threadpool(file_data.read, block_size)
+            if not chunk:
+                slots.release()
+                break
+
+            # Block ids must all have the same length
+            block_id = base64.b64encode(f"{len(blocks):08d}".encode()).decode()
+            blocks.append(BlobBlock(block_id=block_id))
+            size += len(chunk)
+            pending.add(asyncio.create_task(_stage_block(blob_client, block_id, chunk, slots)))
+
+            # Stop reading as soon as a block failed
+            done = {task for task in pending if task.done()}
+            pending -= done
+            for task in done:
+                task.result()
+
+        await asyncio.gather(*pending)
+    except BaseException:
+        # Uncommitted blocks are discarded by the service after a week
+        for task in pending:
+            task.cancel()
+        raise
+
+    await blob_client.commit_block_list(blocks, content_settings=content_settings)
+    return size
+
+
+class AzureBlobBackend(StorageBackend):
+    """
+    Azure Blob Storage. The sync client only signs SAS tokens; all I/O goes
+    through one async client whose connection pool is shared by every request.
+
+    Uploads above block_threshold are staged as concurrent blocks, at most
+    max_concurrency in flight, so one upload holds at most
+    block_size * max_concurrency bytes in memory.
+    """
+
+    def __init__(self, connection_string: str, account_key: str, container_name: str,
+                 public_container_name: Optional[str] = None, max_connections: int = 100,
+                 block_threshold: int = 8 * 1024 * 1024, block_size: int = 4 * 1024 * 1024, max_concurrency: int = 4):
+        self._connection_string = connection_string
+        self._account_key = account_key
+        self._max_connections = max_connections
+        self.block_threshold = block_threshold
+        self.block_size = block_size
+        self.max_concurrency = max_concurrency
+
+        service = BlobServiceClient.from_connection_string(connection_string)
+        self._container = service.get_container_client(container_name)
+        self._public_container = service.get_container_client(public_container_name) if public_container_name else None
+        self._async_service: Optional[AsyncBlobServiceClient] = None
+
+    async def start(self):
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self._max_connections))
+        self._async_service = AsyncBlobServiceClient.from_connection_string(
+            self._connection_string,
+            transport=AioHttpTransport(session=session, session_owner=True),
+        )
+
+    async def close(self):
+        if self._async_service is not None:
+            await self._async_service.close()
+            self._async_service = None
+
+    def container(self, public: bool = False):
+        """
+        Async container client; only available between start() and close().
+        """
+        if self._async_service is None:
+            raise RuntimeError("Azure blob backend not started, call start() first (app lifespan)")
+        if public and self._public_container is None:
+            raise ValueError("azure_storage_public_container_name is not set")
+        return self._async_service.get_container_client(
+            (self._public_container if public else self._container).container_name)
+
+    async def create_containers(self):
+        targets = [(self.container(), None)]
+        if self._public_container is not None:
+            targets.append((self.container(public=True), PublicAccess.Blob))
+        for container, public_access in targets:
+            try:
+                await container.create_container(public_access=public_access)
+            except ResourceExistsError:
+                pass
+
+    async def upload(self, blob_name, file_data, content_type, cache_control=None, public=False) -> str:
+        blob_client = self.container(public).get_blob_client(blob_name)
+        content_settings = ContentSettings(content_type=content_type, cache_control=cache_control)
+        if stream_size(file_data) > self.block_threshold:
+            await upload_in_blocks(blob_client, file_data, content_settings, self.block_size, self.max_concurrency)
+        else:
+            await blob_client.upload_blob(file_data, overwrite=True, content_settings=content_settings)
+        return blob_client.url
+
+    async def download(self, blob_name, public=False, length=None) -> bytes:
+        blob_client = self.container(public).get_blob_client(blob_name)
+        if length is None:
+            return await (await blob_client.download_blob()).readall()
+        return await (await blob_client.download_blob(offset=0, length=length)).readall()
+
+    async def get_properties(self, blob_name, public=False) -> Optional[BlobInfo]:
+        try:
+            properties = await self.container(public).get_blob_client(blob_name).get_blob_properties()
+        except ResourceNotFoundError:
+            return None
+        return BlobInfo(blob_name, properties.size, properties.content_settings.content_type,
+                        properties.last_modified, properties.content_settings.cache_control)
+
+    async def delete(self, blob_names) -> List[Optional[str]]:
+        # One batch request; the blob batch API takes up to max_batch_delete blobs
+        if not blob_names:
+            return []
+        responses = await self.container().delete_blobs(*blob_names, delete_snapshots="include",
+                                                        raise_on_any_failure=False)
+        errors = []
+        async for response in responses:
+            if response.status_code in (202, 404):
+                errors.append(None)
+            else:
+                errors.append(f"{response.status_code} {response.headers.get('x-ms-error-code', response.reason)}")
+        return errors
+
+    async def list(self, prefix):
+        async for blob in self.container().list_blobs(name_starts_with=prefix):
+            yield BlobInfo(blob.name, blob.size, blob.content_settings.content_type,
+                           blob.last_modified, blob.content_settings.cache_control)
+
+    def url(self, blob_name: str, public: bool = False) -> str:
+        return (self._public_container if public else self._container).get_blob_client(blob_name).url
+
+    def blob_name_from_url(self, url: str) -> str:
+        return BlobClient.from_blob_url(url).blob_name
+
+    @property
+    def public_base_url(self) -> Optional[str]:
+        return self._public_container.url if self._public_container is not None else None
+
+    def create_read_sas(self, expiry: datetime) -> str:
+        return generate_container_sas(
+            account_name=self._container.account_name,
+            container_name=self._container.container_name,
+            account_key=self._account_key,
+            permission=ContainerSasPermissions(read=True),
+            expiry=expiry,
+            start=datetime.now(timezone.utc),
+        )
+
+    def create_upload_sas(self, blob_name: str, expiry: datetime) -> str:
+        # Create and write on this one blob only, no read
+        return generate_blob_sas(
+            account_name=self._container.account_name,
+            container_name=self._container.container_name,
+            blob_name=blob_name,
+            account_key=self._account_key,
+            permission=BlobSasPermissions(create=True, write=True),
+            expiry=expiry,
+            start=datetime.now(timezone.utc) - timedelta(minutes=5),   # tolerate client clock skew
+        )
+
+    def upload_headers(self, content_type: str) -> Dict[str, str]:
+        return {"x-ms-blob-type": "BlockBlob", "Content-Type": content_type}
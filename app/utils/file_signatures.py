@@ -0,0 +1,67 @@
+from typing import Optional
+
+# Enough leading bytes to tell every type below apart
+SNIFF_BYTES = 32
+
+IMAGE_TYPES = frozenset({"image/jpeg", "image/png", "image/gif", "image/webp", "image/bmp", "image/tiff",
+                         "image/heic", "image/avif"})
+VIDEO_TYPES = frozenset({"video/mp4", "video/quicktime", "video/3gpp", "video/webm"})
+DOCUMENT_TYPES = frozenset({"application/pdf"})
+
+# What clients send when they don't know the type; the sniffed type is used instead
+UNDECLARED_TYPE = "application/octet-stream"
+
+# Non-standard names clients use for the types above
+_ALIASES = {
+    "image/jpg": "image/jpeg",
+    "image/pjpeg": "image/jpeg",
+    "image/x-png": "image/png",
+    "image/heif": "image/heic",
+    "image/x-ms-bmp": "image/bmp",
+}
+
+_PREFIXES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"\x1a\x45\xdf\xa3", "video/webm"),     # Matroska/WebM EBML header
+    (b"%PDF-", "application/pdf"),
+)
+
+# ISO base media files (bytes 4-8 are "ftyp"), told apart by their major brand
+_FTYP_BRANDS = {
+    b"heic": "image/heic", b"heix": "image/heic", b"hevc": "image/heic", b"mif1": "image/heic",
+    b"avif": "image/avif", b"avis": "image/avif",
+    b"qt  ": "video/quicktime",
+    b"3gp4": "video/3gpp", b"3gp5": "video/3gpp", b"3g2a": "video/3gpp",
+}
+
+
+def normalize_type(content_type: Optional[str]) -> Optional[str]:
+    """
+    Bare, lower-case MIME type of a Content-Type value: "Image/JPG; q=1" -> "image/jpeg".
+    """
+    if not content_type:
+        return None
+    content_type = content_type.split(";", 1)[0].strip().lower()
+    return _ALIASES.get(content_type, content_type) or None
+
+
+def sniff(head: bytes) -> Optional[str]:
+    """
+    MIME type of a file from its first SNIFF_BYTES bytes, or None when it is
+    none of the image, video or document types we accept.
+    """
+    for prefix, content_type in _PREFIXES:
+        if head.startswith(prefix):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        # Other brands (isom, mp41, mp42, M4V, ...) are MP4 variants
+        return _FTYP_BRANDS.get(head[8:12], "video/mp4")
+    return None
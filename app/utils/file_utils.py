@@ -1,20 +1,39 @@
+from typing import Optional
 from fastapi import UploadFile, HTTPException, status
-from ..services import azure_storage_service
+from .. import schemas
+from ..services import direct_upload_service, image_service, media_service, storage_service
+from ..services.media_service import UploadedMedia
 
 # TODO Structure Storage Account
 
-def upload_profile_picture(file: UploadFile) -> str:
-    # if file.content_type not in ["image/jpeg", "image/png"]:
-    #     raise HTTPException(
-    #         status_code=status.HTTP_400_BAD_REQUEST,
-    #         detail="Invalid file type. Only JPEG and PNG are allowed."
-    #     )
-    
-    return azure_storage_service.upload_file_to_blob(file.file, file.filename, file.content_type)
+async def upload_complaint_file(file: UploadFile) -> str:
+    return (await media_service.store_upload(file, with_variants=False)).url
+
+
+async def upload_image(file: UploadFile) -> UploadedMedia:
+    """
+    Upload the original (or reuse an identical one) and, for images, its resized variants.
+    """
+    return await media_service.store_upload(file)
+
+
+async def resolve_upload(file: Optional[UploadFile], upload_token: Optional[str],
+                         user_id: Optional[int], purpose: schemas.UploadPurpose) -> Optional[UploadedMedia]:
+    """
+    Media for a create/update request: finalizes a direct-to-storage upload
+    when an upload_token is given, otherwise uploads the file sent with the request.
+    """
+    if upload_token:
+        url, properties = await direct_upload_service.finalize_upload(upload_token, user_id, purpose)
+        if purpose == schemas.UploadPurpose.complaint \
+                or not image_service.wants_variants(properties.content_type, properties.size):
+            return UploadedMedia(url)
+        data = await storage_service.download_blob(storage_service.blob_name_from_url(url))
+        return UploadedMedia(url, await image_service.create_variants(url, data))
+    if file and file.size:
+        return await upload_image(file)
+    return None
 
 
 def add_sas_token_to_url(url: str) -> str:
-    if url:
-        sas_token = azure_storage_service.create_service_sas_container()
-        return f"{url}?{sas_token}"
-    return url
+    return storage_service.add_sas_token(url)
@@ -0,0 +1,30 @@
+import io
+from typing import Dict
+
+from PIL import Image, ImageOps
+
+# Runs inside the image process pool (services/image_service.py); keep this module free of app imports
+
+CONTENT_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg"}
+
+
+def render_variants(data: bytes, sizes: Dict[str, int], image_format: str, quality: int) -> Dict[str, bytes]:
+    """
+    Decode an image once and encode a copy per size, fitted within size x size
+    (never upscaled). Returns {variant name: encoded bytes}.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        # Let the JPEG decoder downscale while decoding; much cheaper for large photos
+        image.draft("RGB", (max(sizes.values()), max(sizes.values())))
+        image = ImageOps.exif_transpose(image)
+        if image_format == "JPEG" or image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if image_format == "WEBP" and image.has_transparency_data else "RGB")
+
+        variants = {}
+        for name, size in sizes.items():
+            resized = image.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+            out = io.BytesIO()
+            resized.save(out, image_format, quality=quality)
+            variants[name] = out.getvalue()
+        return variants
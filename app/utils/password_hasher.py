@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from passlib.context import CryptContext
+
+
+class PasswordHasherBusy(Exception):
+    """
+    Raised when the hashing queue is full and the call was rejected.
+    """
+
+
+class PasswordHasher:
+    """
+    Runs passlib hashing on a dedicated, size-limited thread pool so bursts of
+    logins/signups can't block the event loop or exhaust the shared threadpool.
+    At most workers + max_queue calls are pending at once; the rest are rejected.
+    """
+
+    def __init__(self, context: CryptContext, workers: int, max_queue: int):
+        self.context = context
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats = {"completed": 0, "rejected": 0, "rehashed": 0, "wait_seconds_total": 0.0, "hash_seconds_total": 0.0}
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def queue_depth(self) -> int:
+        # Calls submitted but not yet picked up by a worker
+        return max(0, self._pending - self.workers)
+
+    async def _run(self, fn: Callable, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise PasswordHasherBusy()
+            self._pending += 1
+
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.stats["wait_seconds_total"] += started - submitted
+                    self.stats["hash_seconds_total"] += time.perf_counter() - started
+                    self.stats["completed"] += 1
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """
+        Returns (valid, new_hash). new_hash is set when the stored hash uses
+        outdated settings (e.g. fewer bcrypt rounds) and should be saved.
+        """
+        valid, new_hash = await self._run(self.context.verify_and_update, password, hashed)
+        if new_hash:
+            with self._lock:
+                self.stats["rehashed"] += 1
+        return valid, new_hash
@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """
+    Counters for one engine's connection pool, fed by SQLAlchemy pool events.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checked_out = 0
+        self.checkouts_total = 0
+        self.connections_created = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+        logger.warning(f"Connection pool '{self.name}' timed out waiting for a connection")
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connections_created += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts_total += 1
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self, engine: Engine) -> dict:
+        pool = engine.pool
+        with self._lock:
+            stats = {
+                "checked_out": self.checked_out,
+                "checkouts_total": self.checkouts_total,
+                "connections_created": self.connections_created,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "pool_size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+            })
+        return stats
+
+
+class _TimedCheckoutMixin:
+    """
+    Measures how long a checkout waits on the pool queue, which the pool events can't see.
+    """
+    _metrics: PoolMetrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            if self._metrics:
+                self._metrics.record_timeout()
+            raise
+        finally:
+            if self._metrics:
+                self._metrics.record_wait(time.perf_counter() - start)
+
+    def recreate(self):
+        # Engine.dispose() swaps in a fresh pool; keep feeding the same counters
+        new_pool = super().recreate()
+        new_pool._metrics = self._metrics
+        return new_pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_registry: Dict[str, tuple] = {}
+
+
+def attach_pool_metrics(engine: Engine, name: str) -> PoolMetrics:
+    """
+    Start collecting pool metrics for `engine` (pass `async_engine.sync_engine` for async engines).
+    """
+    metrics = PoolMetrics(name)
+    engine.pool._metrics = metrics
+
+    event.listen(engine, "connect", metrics.on_connect)
+    event.listen(engine, "checkout", metrics.on_checkout)
+    event.listen(engine, "checkin", metrics.on_checkin)
+    event.listen(engine, "invalidate", metrics.on_invalidate)
+
+    _registry[name] = (metrics, engine)
+    return metrics
+
+
+def get_pool_stats() -> Dict[str, dict]:
+    return {name: metrics.snapshot(engine) for name, (metrics, engine) in _registry.items()}
@@ -0,0 +1,149 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+_NUMBER = re.compile(r"\b\d+\b")
+_QUOTED = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST = re.compile(r"\bIN\s*\((?:[^()]*)\)", re.IGNORECASE)
+_BIND = re.compile(r"%\(\w+\)s|\$\d+|\?")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Normalize a SQL statement so the same query issued with different values
+    (the shape of an N+1 loop) collapses to one key.
+    """
+    statement = _QUOTED.sub("?", statement)
+    statement = _BIND.sub("?", statement)
+    statement = _IN_LIST.sub("IN (...)", statement)
+    statement = _NUMBER.sub("?", statement)
+    return _SPACE.sub(" ", statement).strip()
+
+
+class QueryStats:
+    """
+    Queries executed while one collector was active.
+    """
+
+    def __init__(self, label: str = ""):
+        self.label = label
+        self.count = 0
+        self.db_seconds = 0.0
+        self.fingerprints: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.db_seconds += seconds
+            self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n >= threshold]
+
+    def report(self) -> str:
+        lines = [f"{self.count} queries, {self.db_seconds * 1000:.1f} ms in DB ({self.label})"]
+        lines += [f"  {n}x {fp}" for fp, n in self.fingerprints.most_common()]
+        return "\n".join(lines)
+
+
+_request_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Collectors that count every query in the process regardless of context,
+# so tests can observe requests served on TestClient's event-loop thread
+_global_collectors: List[QueryStats] = []
+_global_lock = threading.Lock()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if _global_collectors:
+        with _global_lock:
+            collectors = list(_global_collectors)
+        for collector in collectors:
+            collector.record(statement, elapsed)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _request_stats.get()
+
+
+def route_label(request: Request) -> str:
+    route = request.scope.get("route")
+    return f"{request.method} {route.path if route else request.url.path}"
+
+
+async def query_counter_middleware(request: Request, call_next):
+    """
+    Counts queries and DB time per request, reports them in `X-DB-Query-Count`
+    and `Server-Timing`, and logs requests that look like N+1 patterns.
+    """
+    stats = QueryStats(f"{request.method} {request.url.path}")
+    token = _request_stats.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        _request_stats.reset(token)
+
+    stats.label = route_label(request)
+    response.headers["X-DB-Query-Count"] = str(stats.count)
+    response.headers["Server-Timing"] = f"db;dur={stats.db_seconds * 1000:.1f}"
+
+    repeated = stats.repeated(settings.query_repeat_warn_threshold)
+    if repeated:
+        logger.warning(
+            f"Possible N+1 in {stats.label}: "
+            + "; ".join(f"{n}x {fp[:200]}" for fp, n in repeated)
+        )
+    elif stats.count > settings.query_count_warn_threshold:
+        logger.warning(f"{stats.label} ran {stats.count} queries")
+
+    return response
+
+
+@contextmanager
+def assert_max_queries(max_queries: int, label: str = ""):
+    """
+    Test helper: fail if more than `max_queries` statements run inside the block.
+
+        with assert_max_queries(3):
+            client.get("/posts/", headers=auth_headers)
+    """
+    stats = QueryStats(label)
+    with _global_lock:
+        _global_collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        with _global_lock:
+            _global_collectors.remove(stats)
+
+    if stats.count > max_queries:
+        raise AssertionError(f"Query budget exceeded: expected at most {max_queries}, got {stats.report()}")
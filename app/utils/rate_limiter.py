@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Tuple
+
+# (key, capacity, refill_per_second)
+Bucket = Tuple[str, float, float]
+
+
+class TokenBucketBackend:
+    """
+    Storage for token buckets. `take_all` removes `cost` tokens from every
+    bucket only if each of them has enough, so a rejected request costs
+    nothing. It returns, per bucket, 0 when that bucket allows the request,
+    otherwise the seconds until enough tokens have refilled.
+    """
+
+    async def take_all(self, buckets: List[Bucket], cost: float = 1) -> List[float]:
+        raise NotImplementedError
+
+    async def take(self, key: str, capacity: float, refill_per_second: float, cost: float = 1) -> float:
+        return (await self.take_all([(key, capacity, refill_per_second)], cost))[0]
+
+
+class MemoryBackend(TokenBucketBackend):
+    """
+    Per-process buckets. With several workers each one enforces its own
+    limit, so the effective limit is capacity * workers.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take_all(self, buckets: List[Bucket], cost: float = 1) -> List[float]:
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            for key, capacity, refill_per_second in buckets:
+                tokens, updated = self._buckets.pop(key, (capacity, now))
+                levels.append(min(capacity, tokens + (now - updated) * refill_per_second))
+
+            waits = [0.0 if tokens >= cost else (cost - tokens) / refill_per_second
+                     for tokens, (_, _, refill_per_second) in zip(levels, buckets)]
+            allowed = not any(waits)
+
+            for tokens, (key, _, _) in zip(levels, buckets):
+                self._buckets[key] = (tokens - cost if allowed else tokens, now)
+            # Least recently used buckets are dropped first; a dropped bucket simply starts full again
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return waits
+
+
+# Refill, check and take in one round trip so concurrent workers can't both spend the last token.
+# ARGV: cost, then capacity and rate for each of KEYS
+_REDIS_TAKE_ALL = """
+local cost = tonumber(ARGV[1])
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+
+local levels, waits, allowed = {}, {}, true
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local bucket = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    levels[i] = math.min(capacity, tokens + (now - updated) * rate)
+    if levels[i] >= cost then
+        waits[i] = '0'
+    else
+        waits[i] = tostring((cost - levels[i]) / rate)
+        allowed = false
+    end
+end
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2])
+    local rate = tonumber(ARGV[i * 2 + 1])
+    local tokens = levels[i]
+    if allowed then
+        tokens = tokens - cost
+    end
+    redis.call('HSET', key, 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', key, math.ceil(capacity / rate) + 1)
+end
+return waits
+"""
+
+
+class RedisBackend(TokenBucketBackend):
+    """
+    Buckets shared by every worker and instance through Redis.
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        # Optional dependency, only needed when this backend is selected
+        from redis.asyncio import Redis
+
+        self.prefix = prefix
+        self._redis = Redis.from_url(url)
+        self._script = self._redis.register_script(_REDIS_TAKE_ALL)
+
+    async def take_all(self, buckets: List[Bucket], cost: float = 1) -> List[float]:
+        args = [cost]
+        for _, capacity, refill_per_second in buckets:
+            args += [capacity, refill_per_second]
+        result = await self._script(keys=[self.prefix + key for key, _, _ in buckets], args=args)
+        return [float(wait) for wait in result]
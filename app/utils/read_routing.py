@@ -0,0 +1,72 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from fastapi import Request
+from jose import JWTError, jwt
+
+READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def request_user_id(request: Request) -> Optional[int]:
+    """
+    Read `user_id` from the bearer token without verifying it.
+
+    Only used to route reads; authentication still happens in oauth2.get_current_user,
+    so a forged token can at most send its own reads to the primary. Writes are
+    recorded with mark_write from the auth dependencies, after the signature is checked.
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.get_unverified_claims(token).get("user_id")
+    except JWTError:
+        return None
+
+
+class ReadYourWritesTracker:
+    """
+    Remembers which users wrote recently so their reads stay on the primary
+    until the replica has had time to catch up.
+
+    State is per worker process: a user whose next read lands on another worker
+    can still see replica lag, bounded by the replica's replay delay.
+    """
+
+    def __init__(self, window_seconds: float, max_entries: int = 100_000):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._sticky_until: Dict[int, float] = {}
+        self._next_prune = 0.0
+
+    def mark_write(self, user_id: int):
+        """
+        Open the stickiness window for a user whose token has been verified.
+        """
+        now = time.monotonic()
+        with self._lock:
+            # Expired entries are dropped once per window, so the dict only holds recent writers
+            if now >= self._next_prune or len(self._sticky_until) >= self.max_entries:
+                self._sticky_until = {k: v for k, v in self._sticky_until.items() if v > now}
+                self._next_prune = now + self.window_seconds
+            # Still full of live entries: the oldest writers lose their window first
+            while len(self._sticky_until) >= self.max_entries:
+                del self._sticky_until[next(iter(self._sticky_until))]
+            self._sticky_until.pop(user_id, None)
+            self._sticky_until[user_id] = now + self.window_seconds
+
+    def is_sticky(self, user_id: int) -> bool:
+        deadline = self._sticky_until.get(user_id)
+        return deadline is not None and deadline > time.monotonic()
+
+    def use_replica(self, request: Request) -> bool:
+        """
+        Reads go to the replica unless the same user wrote within the stickiness window;
+        writes always go to the primary.
+        """
+        if request.method not in READ_ONLY_METHODS:
+            return False
+        user_id = request_user_id(request)
+        return user_id is None or not self.is_sticky(user_id)
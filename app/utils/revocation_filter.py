@@ -0,0 +1,68 @@
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+# (jti, expires_at as a unix timestamp)
+Entry = Tuple[str, float]
+
+
+class RevocationFilter:
+    """
+    In-memory set of revoked access token ids (JWT `jti`), so checking a token never touches the database.
+
+    Loaded once from the revoked_tokens table, then kept current with the rows revoked since
+    (see oauth2.keep_revocations_fresh). Entries are dropped once the token they block has expired,
+    so the size follows the number of logouts within one access token lifetime; refresh tokens are
+    never held here, they are checked against the database when redeemed.
+    """
+
+    def __init__(self):
+        self._revoked: Dict[str, float] = {}
+        # Revoked locally since the last load; kept across a full load that may have started before them
+        self._recent: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        return jti is not None and jti in self._revoked
+
+    def add(self, jti: str, expires_at: float):
+        with self._lock:
+            self._revoked[jti] = expires_at
+            self._recent[jti] = expires_at
+
+    def replace(self, entries: Iterable[Entry]):
+        """
+        Full load: the entries become the whole set, plus anything added locally meanwhile.
+        """
+        revoked = dict(entries)
+        with self._lock:
+            revoked.update(self._recent)
+            self._revoked = revoked
+            self._recent = {}
+            self.loaded = True
+
+    def update(self, entries: Iterable[Entry]):
+        """
+        Incremental load: merge entries revoked since the previous load.
+        """
+        entries = dict(entries)
+        with self._lock:
+            self._revoked.update(entries)
+            self._recent = {}
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """
+        Drop entries whose token has expired anyway; returns how many were dropped.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [jti for jti, expires_at in self._revoked.items() if expires_at <= now]
+            for jti in expired:
+                del self._revoked[jti]
+            for jti in expired:
+                self._recent.pop(jti, None)
+        return len(expired)
+
+    def __len__(self):
+        return len(self._revoked)
@@ -1,8 +1,22 @@
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 import phonenumbers
 
+from ..config import settings
+from .password_hasher import PasswordHasher, PasswordHasherBusy
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto",
+                           bcrypt__rounds=settings.bcrypt_rounds)
+
+password_hasher = PasswordHasher(pwd_context, settings.password_hash_workers, settings.password_hash_max_queue)
+
+
+def _hasher_busy() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                         detail="Too many authentication requests, try again shortly",
+                         headers={"Retry-After": "1"})
 
 
 def hash(password: str):
@@ -13,6 +27,27 @@ def verify(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def hash_async(password: str) -> str:
+    """
+    hash() on the password hashing executor; use this from async handlers.
+    """
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+
+
+async def verify_and_update_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies on the password hashing executor. Also returns a new hash when the
+    stored one was made with an older bcrypt cost, so the caller can save it.
+    """
+    try:
+        return await password_hasher.verify_and_update(plain_password, hashed_password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+
+
 def validate_phone_number(phone: str) -> str:
     """
     Validates a phone number using the phonenumbers library.
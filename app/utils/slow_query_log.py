@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import random
+import re
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..config import settings
+from .query_counter import current_stats
+
+logger = logging.getLogger(__name__)
+
+# Records go to their own rotating file, one JSON object per line, not to the app log
+slow_query_logger = logging.getLogger("app.slow_queries")
+slow_query_logger.propagate = False
+
+_EXPLAINABLE = ("select", "with")
+# EXPLAIN ANALYZE runs the statement: skip the ones whose effects outlive the rollback
+# (sequence advances) or that would block on or take row locks: data-modifying CTEs and
+# locking reads (FOR [NO KEY] UPDATE is caught by "update", FOR [KEY] SHARE by the second part)
+_NOT_EXPLAINABLE = re.compile(
+    r"\b(insert|update|delete|merge)\b|\bfor\s+(key\s+)?share\b|\b(nextval|setval)\s*\(",
+    re.IGNORECASE,
+)
+_MAX_PARAM_LENGTH = 200
+
+
+def _printable_parameters(parameters):
+    if isinstance(parameters, dict):
+        return {key: _printable_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_printable_parameters(p) if isinstance(p, (dict, list, tuple)) else _printable_value(p)
+                for p in parameters]
+    return _printable_value(parameters)
+
+
+def _printable_value(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = str(value)
+    return text if len(text) <= _MAX_PARAM_LENGTH else text[:_MAX_PARAM_LENGTH] + "..."
+
+
+def _explain(conn, statement, parameters):
+    """
+    Run EXPLAIN (ANALYZE, BUFFERS) for a read query on a separate cursor inside a savepoint
+    that is always rolled back, so the caller's pending result set and transaction are left untouched.
+    """
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+            plan = cursor.fetchone()[0]
+        finally:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return json.loads(plan) if isinstance(plan, str) else plan
+    finally:
+        cursor.close()
+
+
+def _explainable(statement: str) -> bool:
+    return statement.lstrip().lower().startswith(_EXPLAINABLE) and not _NOT_EXPLAINABLE.search(statement)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("slow_query_start_time")
+    if not start_times:
+        return
+    elapsed_ms = (time.perf_counter() - start_times.pop()) * 1000
+    if elapsed_ms < settings.slow_query_threshold_ms:
+        return
+
+    stats = current_stats()
+    record = {
+        "logged_at": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(elapsed_ms, 2),
+        "route": stats.label if stats else None,
+        "statement": statement,
+        "parameters": _printable_parameters(parameters),
+        "plan": None,
+    }
+
+    if (not executemany
+            and _explainable(statement)
+            and random.random() < settings.slow_query_explain_sample_rate):
+        try:
+            record["plan"] = _explain(conn, statement, parameters)
+        except Exception as e:
+            logger.warning(f"EXPLAIN failed for slow query: {e}")
+
+    slow_query_logger.info(json.dumps(record, default=str))
+
+
+def enable_slow_query_log():
+    """
+    Attach the recorder to every engine and open the rotating log file.
+    """
+    if slow_query_logger.handlers:
+        return
+
+    log_dir = os.path.dirname(settings.slow_query_log_path)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+
+    handler = RotatingFileHandler(
+        settings.slow_query_log_path,
+        maxBytes=settings.slow_query_log_max_bytes,
+        backupCount=settings.slow_query_log_backup_count,
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    slow_query_logger.addHandler(handler)
+    slow_query_logger.setLevel(logging.INFO)
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,335 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Mapping, NamedTuple, Optional, Tuple
+from urllib.parse import quote, unquote, urlencode, urlsplit
+
+from fastapi.concurrency import run_in_threadpool
+
+
+class BlobInfo(NamedTuple):
+    name: str
+    size: int
+    content_type: Optional[str]
+    last_modified: Optional[datetime]
+    cache_control: Optional[str] = None
+
+
+class StorageBackend:
+    """
+    Where uploaded media is kept. Blobs are addressed by name; records store the
+    URL from url(). Private blobs are read through URLs carrying the query string
+    from create_read_sas(), public ones (reference media) are served unsigned.
+    """
+
+    # Most blobs one delete() call accepts
+    max_batch_delete = 256
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def create_containers(self):
+        """
+        Create the private and public areas if the backend needs them created.
+        """
+
+    async def upload(self, blob_name: str, file_data, content_type: Optional[str],
+                     cache_control: Optional[str] = None, public: bool = False) -> str:
+        """
+        Store file_data (bytes or a binary file object) and return the blob URL.
+        """
+        raise NotImplementedError
+
+    async def download(self, blob_name: str, public: bool = False, length: Optional[int] = None) -> bytes:
+        """
+        The blob's bytes, only the first `length` of them when given
+        (a range, so length must be between 1 and the blob's size).
+        """
+        raise NotImplementedError
+
+    async def get_properties(self, blob_name: str, public: bool = False) -> Optional[BlobInfo]:
+        """
+        None when the blob does not exist.
+        """
+        raise NotImplementedError
+
+    async def delete(self, blob_names: List[str]) -> List[Optional[str]]:
+        """
+        Delete private blobs. Returns, in order, None for each blob that is gone
+        (deleted or already missing), otherwise the error.
+        """
+        raise NotImplementedError
+
+    def list(self, prefix: str) -> AsyncIterator[BlobInfo]:
+        raise NotImplementedError
+
+    def url(self, blob_name: str, public: bool = False) -> str:
+        raise NotImplementedError
+
+    def blob_name_from_url(self, url: str) -> str:
+        raise NotImplementedError
+
+    @property
+    def public_base_url(self) -> Optional[str]:
+        """
+        Prefix of public blob URLs, None when the backend has no public area.
+        """
+        return None
+
+    def create_read_sas(self, expiry: datetime) -> str:
+        """
+        Query string granting read access to every private blob until expiry.
+        """
+        raise NotImplementedError
+
+    def create_upload_sas(self, blob_name: str, expiry: datetime) -> str:
+        """
+        Query string allowing a client to create this one private blob until expiry.
+        """
+        raise NotImplementedError
+
+    def upload_headers(self, content_type: str) -> Dict[str, str]:
+        """
+        Headers a client must send with its PUT to a create_upload_sas URL.
+        """
+        return {"Content-Type": content_type}
+
+
+PRIVATE = "private"
+PUBLIC = "public"
+
+
+def stream_size(file_data) -> int:
+    """
+    Bytes left to read in file_data (bytes or a seekable file), 0 when it can't be told.
+    """
+    if isinstance(file_data, (bytes, bytearray)):
+        return len(file_data)
+    try:
+        position = file_data.tell()
+        size = file_data.seek(0, os.SEEK_END) - position
+        file_data.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return 0
+
+
+def _read_all(file_data) -> bytes:
+    if isinstance(file_data, (bytes, bytearray)):
+        return bytes(file_data)
+    return file_data.read()
+
+
+class AppServedBackend(StorageBackend):
+    """
+    Storage whose blobs are served by the API itself (routers/storage.py) at
+    base_url/{private|public}/{blob name}. Private URLs are signed with an
+    HMAC of the expiry, the same shape as an Azure SAS (se, sp, sig).
+
+    latency_ms is added to every operation to stand in for the network round
+    trip to a real object store.
+    """
+
+    def __init__(self, base_url: str, secret: str, latency_ms: float = 0):
+        self.base_url = base_url.rstrip("/")
+        self._secret = secret.encode()
+        self.latency_ms = latency_ms
+
+    async def _round_trip(self):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+    def url(self, blob_name: str, public: bool = False) -> str:
+        return f"{self.base_url}/{PUBLIC if public else PRIVATE}/{quote(blob_name, safe='/')}"
+
+    def blob_name_from_url(self, url: str) -> str:
+        path = urlsplit(url).path
+        for area in (PRIVATE, PUBLIC):
+            prefix = urlsplit(f"{self.base_url}/{area}/").path
+            if path.startswith(prefix):
+                return unquote(path[len(prefix):])
+        raise ValueError(f"{url} is not a blob URL of this storage")
+
+    @property
+    def public_base_url(self) -> Optional[str]:
+        return f"{self.base_url}/{PUBLIC}"
+
+    def _sign(self, *fields: str) -> str:
+        digest = hmac.new(self._secret, "\n".join(fields).encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).decode().rstrip("=")
+
+    def create_read_sas(self, expiry: datetime) -> str:
+        se = str(int(expiry.timestamp()))
+        return urlencode({"se": se, "sp": "r", "sig": self._sign("r", se)})
+
+    def create_upload_sas(self, blob_name: str, expiry: datetime) -> str:
+        se = str(int(expiry.timestamp()))
+        return urlencode({"se": se, "sp": "cw", "sig": self._sign("cw", se, blob_name)})
+
+    def verify(self, blob_name: str, query: Mapping[str, str], permission: str) -> bool:
+        """
+        Check a signed URL's query string grants permission ("r" or "cw") on blob_name.
+        """
+        se, sp, sig = query.get("se", ""), query.get("sp"), query.get("sig", "")
+        if sp != permission or not se.isdigit() or int(se) < time.time():
+            return False
+        fields = ("r", se) if permission == "r" else ("cw", se, blob_name)
+        return hmac.compare_digest(sig, self._sign(*fields))
+
+
+class MemoryStorageBackend(AppServedBackend):
+    """
+    Blobs in a dict, per process and gone on restart. For tests and load tests.
+    """
+
+    def __init__(self, base_url: str, secret: str, latency_ms: float = 0):
+        super().__init__(base_url, secret, latency_ms)
+        self._lock = threading.Lock()
+        # (area, name) -> (data, content_type, cache_control, last_modified)
+        self._blobs: Dict[Tuple[str, str], Tuple[bytes, Optional[str], Optional[str], datetime]] = {}
+
+    async def upload(self, blob_name, file_data, content_type, cache_control=None, public=False) -> str:
+        data = await run_in_threadpool(_read_all, file_data)
+        await self._round_trip()
+        with self._lock:
+            self._blobs[(PUBLIC if public else PRIVATE, blob_name)] = (
+                data, content_type, cache_control, datetime.now(timezone.utc))
+        return self.url(blob_name, public)
+
+    async def download(self, blob_name, public=False, length=None) -> bytes:
+        await self._round_trip()
+        blob = self._blobs.get((PUBLIC if public else PRIVATE, blob_name))
+        if blob is None:
+            raise FileNotFoundError(blob_name)
+        return blob[0][:length]
+
+    async def get_properties(self, blob_name, public=False) -> Optional[BlobInfo]:
+        await self._round_trip()
+        blob = self._blobs.get((PUBLIC if public else PRIVATE, blob_name))
+        return BlobInfo(blob_name, len(blob[0]), blob[1], blob[3], blob[2]) if blob else None
+
+    async def delete(self, blob_names) -> List[Optional[str]]:
+        await self._round_trip()
+        with self._lock:
+            for name in blob_names:
+                self._blobs.pop((PRIVATE, name), None)
+        return [None] * len(blob_names)
+
+    async def list(self, prefix):
+        await self._round_trip()
+        with self._lock:
+            blobs = sorted((name, blob) for (area, name), blob in self._blobs.items()
+                           if area == PRIVATE and name.startswith(prefix))
+        for name, (data, content_type, cache_control, last_modified) in blobs:
+            yield BlobInfo(name, len(data), content_type, last_modified, cache_control)
+
+
+class LocalStorageBackend(AppServedBackend):
+    """
+    Blobs as files under root/{private|public}/, with content type and cache
+    control kept in root/.meta/. For development and offline CI: real disk I/O.
+    """
+
+    def __init__(self, root: str, base_url: str, secret: str, latency_ms: float = 0):
+        super().__init__(base_url, secret, latency_ms)
+        self.root = os.path.abspath(root)
+
+    def _path(self, blob_name: str, public: bool = False, meta: bool = False) -> str:
+        area = os.path.join(self.root, ".meta" if meta else "", PUBLIC if public else PRIVATE)
+        path = os.path.abspath(os.path.join(area, blob_name + (".json" if meta else "")))
+        if not path.startswith(area + os.sep):
+            raise ValueError(f"Invalid blob name {blob_name!r}")
+        return path
+
+    async def create_containers(self):
+        for area in (PRIVATE, PUBLIC):
+            os.makedirs(os.path.join(self.root, area), exist_ok=True)
+
+    def _write(self, blob_name, file_data, content_type, cache_control, public):
+        path, meta_path = self._path(blob_name, public), self._path(blob_name, public, meta=True)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        # Write aside and rename, so readers never see a partial file
+        partial = f"{path}.{threading.get_ident()}.partial"
+        with open(partial, "wb") as out:
+            if isinstance(file_data, (bytes, bytearray)):
+                out.write(file_data)
+            else:
+                shutil.copyfileobj(file_data, out)
+        with open(meta_path, "w") as meta:
+            json.dump({"content_type": content_type, "cache_control": cache_control}, meta)
+        os.replace(partial, path)
+
+    def _meta(self, blob_name: str, public: bool = False) -> dict:
+        try:
+            with open(self._path(blob_name, public, meta=True)) as meta:
+                return json.load(meta)
+        except FileNotFoundError:
+            return {}
+
+    def _info(self, blob_name: str, public: bool = False) -> Optional[BlobInfo]:
+        try:
+            stat = os.stat(self._path(blob_name, public))
+        except FileNotFoundError:
+            return None
+        meta = self._meta(blob_name, public)
+        return BlobInfo(blob_name, stat.st_size, meta.get("content_type"),
+                        datetime.fromtimestamp(stat.st_mtime, timezone.utc), meta.get("cache_control"))
+
+    def _read(self, blob_name: str, public: bool, length: Optional[int]) -> bytes:
+        with open(self._path(blob_name, public), "rb") as data:
+            return data.read(-1 if length is None else length)
+
+    def _remove(self, blob_name: str) -> Optional[str]:
+        for path in (self._path(blob_name), self._path(blob_name, meta=True)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                return str(e)
+        return None
+
+    def _list(self, prefix: str) -> List[BlobInfo]:
+        area = os.path.join(self.root, PRIVATE)
+        blobs = []
+        for directory, _, files in os.walk(area):
+            for file_name in files:
+                name = os.path.relpath(os.path.join(directory, file_name), area).replace(os.sep, "/")
+                if name.startswith(prefix) and not name.endswith(".partial"):
+                    info = self._info(name)
+                    if info is not None:
+                        blobs.append(info)
+        return sorted(blobs, key=lambda info: info.name)
+
+    async def upload(self, blob_name, file_data, content_type, cache_control=None, public=False) -> str:
+        await self._round_trip()
+        await run_in_threadpool(self._write, blob_name, file_data, content_type, cache_control, public)
+        return self.url(blob_name, public)
+
+    async def download(self, blob_name, public=False, length=None) -> bytes:
+        await self._round_trip()
+        return await run_in_threadpool(self._read, blob_name, public, length)
+
+    async def get_properties(self, blob_name, public=False) -> Optional[BlobInfo]:
+        await self._round_trip()
+        return await run_in_threadpool(self._info, blob_name, public)
+
+    async def delete(self, blob_names) -> List[Optional[str]]:
+        await self._round_trip()
+        return await run_in_threadpool(lambda: [self._remove(name) for name in blob_names])
+
+    async def list(self, prefix):
+        await self._round_trip()
+        for info in await run_in_threadpool(self._list, prefix):
+            yield info
@@ -0,0 +1,224 @@
+from typing import Callable, FrozenSet, Optional
+
+from fastapi import HTTPException, status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:
+    import multipart
+    from multipart.multipart import parse_options_header
+
+from .file_signatures import SNIFF_BYTES, UNDECLARED_TYPE, normalize_type, sniff
+
+# Form fields and multipart framing on top of the file itself
+FORM_OVERHEAD_BYTES = 1024 * 1024
+
+
+class UploadPolicy:
+    """
+    What one endpoint accepts: files of at most max_bytes whose leading bytes
+    are one of allowed_types (see utils/file_signatures.py) and match the type
+    the client declared for them, if any.
+    """
+
+    def __init__(self, name: str, max_bytes: int, allowed_types: FrozenSet[str]):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.allowed_types = allowed_types
+
+    @property
+    def max_request_bytes(self) -> int:
+        return self.max_bytes + FORM_OVERHEAD_BYTES
+
+    def too_large(self) -> HTTPException:
+        return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                             detail=f"File is larger than {self.max_bytes} bytes")
+
+    def unsupported_type(self) -> HTTPException:
+        return HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                             detail=f"Unsupported file type, allowed: {', '.join(sorted(self.allowed_types))}")
+
+    def check_type(self, head: bytes, declared_type: Optional[str] = None):
+        content_type = sniff(head)
+        if content_type not in self.allowed_types:
+            raise self.unsupported_type()
+        # The declared type is what gets stored and served back, it must not say e.g. text/html
+        declared_type = normalize_type(declared_type)
+        if declared_type not in (None, UNDECLARED_TYPE, content_type):
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                                detail=f"File content is {content_type}, not the declared {declared_type}")
+
+
+class _FileCheck:
+    """
+    Size and signature check of one file, fed as it arrives.
+    """
+
+    def __init__(self, policy: UploadPolicy, declared_type: Optional[str]):
+        self.policy = policy
+        self.declared_type = declared_type
+        self.size = 0
+        self.head = b""
+        self.checked = False
+
+    def feed(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.policy.max_bytes:
+            raise self.policy.too_large()
+        if not self.checked:
+            self.head += data[:SNIFF_BYTES - len(self.head)]
+            if len(self.head) >= SNIFF_BYTES:
+                self.finish()
+
+    def finish(self):
+        # Empty file fields are how clients send "no file"
+        if not self.checked and self.head:
+            self.checked = True
+            self.policy.check_type(self.head, self.declared_type)
+
+
+class _MultipartInspector:
+    """
+    Runs the same streaming multipart parser as Starlette over the raw body and
+    checks each file part, so a bad file is rejected at its first chunk.
+    """
+
+    def __init__(self, boundary: bytes, policy: UploadPolicy):
+        self.policy = policy
+        self._file: Optional[_FileCheck] = None
+        self._header_field = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._part_type = b""
+        self._parser = multipart.MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self):
+        self._file = None
+        self._disposition = b""
+        self._part_type = b""
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        field = self._header_field.lower()
+        if field == b"content-disposition":
+            self._disposition = self._header_value
+        elif field == b"content-type":
+            self._part_type = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        if b"filename" in options:
+            self._file = _FileCheck(self.policy, self._part_type.decode("latin-1"))
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._file is not None:
+            self._file.feed(data[start:end])
+
+    def _on_part_end(self):
+        if self._file is not None:
+            self._file.finish()
+
+    def feed(self, chunk: bytes):
+        self._parser.write(chunk)
+
+    def finish(self):
+        self._parser.finalize()
+
+
+class _RawInspector:
+    """
+    A body that is the file itself, e.g. a direct upload PUT.
+    """
+
+    def __init__(self, policy: UploadPolicy, declared_type: Optional[str]):
+        self._file = _FileCheck(policy, declared_type)
+
+    def feed(self, chunk: bytes):
+        self._file.feed(chunk)
+
+    def finish(self):
+        self._file.finish()
+
+
+class UploadGuardMiddleware:
+    """
+    Validates upload bodies while they are received, before the form parser
+    spools them to disk or a route stores them. resolve(method, path) returns
+    the UploadPolicy for a request, or None to let it through unchecked.
+
+    Rejections are raised as HTTPExceptions from receive(); FastAPI re-raises
+    those out of body parsing, so the client gets a 413/415 and the rest of the
+    body is never read.
+    """
+
+    def __init__(self, app, resolve: Callable[[str, str], Optional[UploadPolicy]],
+                 on_reject: Optional[Callable[[UploadPolicy, int], None]] = None):
+        self.app = app
+        self.resolve = resolve
+        self.on_reject = on_reject
+
+    def _rejected(self, policy: UploadPolicy, status_code: int):
+        if self.on_reject is not None:
+            self.on_reject(policy, status_code)
+
+    async def __call__(self, scope, receive, send):
+        policy = self.resolve(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        content_length = headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > policy.max_request_bytes:
+            # Declared too large: answer without reading any of it
+            self._rejected(policy, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            response = JSONResponse({"detail": policy.too_large().detail},
+                                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            await response(scope, receive, send)
+            return
+
+        content_type, options = parse_options_header(headers.get("content-type", ""))
+        if content_type == b"multipart/form-data" and b"boundary" in options:
+            inspector = _MultipartInspector(options[b"boundary"], policy)
+        elif content_type == b"application/x-www-form-urlencoded":
+            inspector = None     # fields only, no file: just the size cap
+        else:
+            inspector = _RawInspector(policy, headers.get("content-type"))
+        received = 0
+
+        async def guarded_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                received += len(body)
+                try:
+                    if received > policy.max_request_bytes:
+                        raise policy.too_large()
+                    if inspector is not None:
+                        inspector.feed(body)
+                        if not message.get("more_body", False):
+                            inspector.finish()
+                except HTTPException as e:
+                    self._rejected(policy, e.status_code)
+                    raise
+            return message
+
+        await self.app(scope, guarded_receive, send)
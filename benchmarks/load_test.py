@@ -0,0 +1,210 @@
+"""
+Scripted load scenarios reporting p50/p95/p99 latency and throughput per endpoint.
+
+Seed first (benchmarks.seed), then either run the API in-process with storage and SMTP stubbed:
+
+    python -m benchmarks.load_test --scenario mixed --concurrency 50 --duration 60
+
+or point it at a running server, e.g. `uvicorn benchmarks.stub_app:app --workers 4`:
+
+    python -m benchmarks.load_test --base-url http://localhost:8000 --scenario feed
+
+(start that server with RATE_LIMIT_ENABLED=false, or logins beyond the per-IP limit get 429s).
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.seed import BENCH_EMAIL, BENCH_PASSWORD
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    def add(self, label, seconds, status_code):
+        self.latencies[label].append(seconds)
+        self.statuses[label][status_code] += 1
+
+    def error(self, label):
+        self.errors[label] += 1
+
+    def report(self, elapsed):
+        rows = []
+        for label in sorted(set(self.latencies) | set(self.errors)):
+            samples = sorted(self.latencies[label])
+            failed = self.errors[label] + sum(n for code, n in self.statuses[label].items() if code >= 500)
+            rows.append({
+                "endpoint": label,
+                "requests": len(samples),
+                "errors": failed,
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p95_ms": percentile(samples, 95) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+                "rps": len(samples) / elapsed,
+                "statuses": dict(self.statuses[label]),
+            })
+        return rows
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(samples)) - 1, 0)
+    return samples[rank]
+
+
+async def timed(client, recorder, label, method, url, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        recorder.error(label)
+        return None
+    recorder.add(label, time.perf_counter() - start, response.status_code)
+    return response
+
+
+class VirtualUser:
+    def __init__(self, client, recorder, user_index):
+        self.client = client
+        self.recorder = recorder
+        self.email = BENCH_EMAIL.format(user_index)
+        self.headers = {}
+        self.post_ids = []
+        self.conversation_ids = []
+
+    async def login(self):
+        response = await timed(self.client, self.recorder, "POST /login/", "POST", "/login/",
+                               data={"username": self.email, "password": BENCH_PASSWORD})
+        if response is None or response.status_code != 200:
+            raise RuntimeError(f"Login failed for {self.email}; did you run benchmarks.seed?")
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def request(self, label, method, url, **kwargs):
+        return await timed(self.client, self.recorder, label, method, url, headers=self.headers, **kwargs)
+
+    async def feed(self):
+        response = await self.request("GET /posts/", "GET", "/posts/", params={"limit": 20, "skip": random.randint(0, 100)})
+        if response is not None and response.status_code == 200:
+            self.post_ids = [post["id"] for post in response.json()] or self.post_ids
+        await self.request("GET /notifications/", "GET", "/notifications/")
+
+    async def liking(self):
+        if not self.post_ids:
+            await self.feed()
+        if not self.post_ids:
+            return
+        post_id = random.choice(self.post_ids)
+        await self.request("POST /like/", "POST", "/like/", json={"post_id": post_id, "dir": 1})
+        await self.request("POST /like/", "POST", "/like/", json={"post_id": post_id, "dir": 0})
+
+    async def messaging(self):
+        if not self.conversation_ids:
+            response = await self.request("GET /messaging/conversations", "GET", "/messaging/conversations")
+            if response is not None and response.status_code == 200:
+                self.conversation_ids = [conversation["id"] for conversation in response.json()]
+        if not self.conversation_ids:
+            return
+        conversation_id = random.choice(self.conversation_ids)
+        await self.request("POST /messaging/conversations/{id}/messages", "POST",
+                           f"/messaging/conversations/{conversation_id}/messages", json={"content": "benchmark"})
+        await self.request("GET /messaging/conversations/{id}/messages", "GET",
+                           f"/messaging/conversations/{conversation_id}/messages", params={"page": 1, "limit": 50})
+
+    async def dropdowns(self):
+        response = await self.request("GET /dropdowns/countries", "GET", "/dropdowns/countries")
+        if response is not None and response.status_code == 200 and response.json():
+            country_id = random.choice(response.json())["id"]
+            await self.request("GET /dropdowns/cities", "GET", "/dropdowns/cities", params={"country_id": country_id})
+        await self.request("GET /pets/animal-types", "GET", "/pets/animal-types")
+        await self.request("GET /pets/breeds", "GET", "/pets/breeds")
+
+
+SCENARIOS = {
+    "feed": {"feed": 1},
+    "liking": {"liking": 1},
+    "messaging": {"messaging": 1},
+    "dropdowns": {"dropdowns": 1},
+    "mixed": {"feed": 6, "liking": 2, "messaging": 1, "dropdowns": 1},
+}
+
+
+async def run_user(client, recorder, user_index, weights, deadline):
+    user = VirtualUser(client, recorder, user_index)
+    await user.login()
+    actions, action_weights = zip(*weights.items())
+    while time.perf_counter() < deadline:
+        await getattr(user, random.choices(actions, action_weights)[0])()
+
+
+async def run(args):
+    recorder = Recorder()
+    weights = SCENARIOS[args.scenario]
+
+    if args.base_url:
+        transport = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=args.concurrency))
+        base_url, lifespan = args.base_url, None
+    else:
+        from benchmarks import stubs
+        stubs.install(storage_latency_ms=args.storage_latency_ms, smtp_latency_ms=args.smtp_latency_ms)
+        from app.main import app
+        from app.config import settings
+        # Every virtual user shares one client address in-process, which the login rate limit would throttle
+        settings.rate_limit_enabled = False
+        transport = httpx.ASGITransport(app=app)
+        base_url, lifespan = "http://bench", app.router.lifespan_context(app)
+
+    async def body():
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout) as client:
+            started = time.perf_counter()
+            deadline = started + args.duration
+            users = random.sample(range(args.users), min(args.concurrency, args.users))
+            await asyncio.gather(*(run_user(client, recorder, index, weights, deadline) for index in users))
+            return time.perf_counter() - started
+
+    if lifespan is not None:
+        async with lifespan:
+            elapsed = await body()
+    else:
+        elapsed = await body()
+
+    rows = recorder.report(elapsed)
+    if args.json:
+        print(json.dumps({"scenario": args.scenario, "concurrency": args.concurrency,
+                          "elapsed_s": elapsed, "endpoints": rows}, indent=2))
+        return
+
+    print(f"\nscenario={args.scenario} concurrency={args.concurrency} elapsed={elapsed:.1f}s")
+    print(f"{'endpoint':<48}{'reqs':>8}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+    for row in rows:
+        print(f"{row['endpoint']:<48}{row['requests']:>8}{row['errors']:>6}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['rps']:>9.1f}")
+    total = sum(row["requests"] for row in rows)
+    print(f"{'total':<48}{total:>8}{'':>6}{'':>10}{'':>10}{'':>10}{total / elapsed:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run load scenarios against the API")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--users", type=int, default=1000, help="seeded users to log in as")
+    parser.add_argument("--base-url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--storage-latency-ms", type=float, default=0, help="simulated blob upload latency (in-process)")
+    parser.add_argument("--smtp-latency-ms", type=float, default=0, help="simulated SMTP latency (in-process)")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Seed a local Postgres with synthetic data for load testing.
+
+Usage (against the database configured in .env, after `alembic upgrade head`):
+
+    python -m benchmarks.seed --users 2000
+
+Every seeded user can log in as `bench-user-<n>@example.com` with the password
+`benchmark-password`, which is what benchmarks.load_test expects.
+"""
+import argparse
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select, text
+
+from app import models
+from app.database import SessionLocal
+from app.utils import security_utils
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+BENCH_PASSWORD = "benchmark-password"
+BENCH_EMAIL = "bench-user-{}@example.com"
+BATCH_SIZE = 5000
+
+ANIMAL_TYPES = {
+    "Mammal": {"Dog": ["Beagle", "Labrador", "Husky", "Poodle", "Mixed"],
+               "Cat": ["Persian", "Siamese", "Maine Coon", "British Shorthair", "Mixed"]},
+    "Bird": {"Parrot": ["Budgie", "Cockatiel", "African Grey"]},
+    "Fish": {"Goldfish": ["Comet", "Oranda"]},
+}
+
+WORDS = ("walk park ball sleepy happy vet treat garden puppy kitten friend snow beach "
+         "morning nap dinner toy bath grooming birthday adventure sunny rainy cute").split()
+
+
+def sentence(min_words=3, max_words=15) -> str:
+    return " ".join(random.choices(WORDS, k=random.randint(min_words, max_words))).capitalize()
+
+
+def media_url(kind: str, n: int) -> str:
+    return f"https://bench.blob.core.windows.net/media/user-data/{kind}-{n}.jpg"
+
+
+def insert_rows(db, model, rows, returning=None):
+    """
+    Insert in batches; returns the generated ids when `returning` is a column.
+    """
+    ids = []
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        if returning is not None:
+            ids.extend(db.scalars(insert(model).returning(returning), batch).all())
+        else:
+            db.execute(insert(model), batch)
+    db.commit()
+    logger.info(f"Inserted {len(rows)} rows into {model.__tablename__}")
+    return ids
+
+
+def ensure_reference_data(db):
+    """
+    Create animal types, pet types and breeds plus a country with cities if the tables are empty.
+    """
+    if not db.scalar(select(models.Breed.id).limit(1)):
+        for animal_name, pet_types in ANIMAL_TYPES.items():
+            animal_type = models.AnimalType(name=animal_name)
+            db.add(animal_type)
+            db.flush()
+            for pet_type_name, breeds in pet_types.items():
+                pet_type = models.PetType(name=pet_type_name, animal_type_id=animal_type.id)
+                db.add(pet_type)
+                db.flush()
+                db.add_all(models.Breed(name=name, pet_type_id=pet_type.id) for name in breeds)
+        db.commit()
+
+    if not db.scalar(select(models.City.id).limit(1)):
+        country = db.scalar(select(models.Country).limit(1))
+        if country is None:
+            country = models.Country(name="Azerbaijan", iso2="AZ", iso3="AZE", emoji="🇦🇿")
+            db.add(country)
+            db.flush()
+        for name in ("Baku", "Ganja", "Sumqayit", "Lankaran", "Shaki"):
+            db.add(models.City(name=name, state_id=0, state_code="-", country_id=country.id,
+                               country_code=country.iso2 or "AZ", latitude=40.4, longitude=49.8))
+        db.commit()
+
+    breeds = db.execute(select(models.Breed.id, models.Breed.pet_type_id, models.PetType.animal_type_id)
+                        .join(models.PetType, models.Breed.pet_type_id == models.PetType.id)).all()
+    cities = db.execute(select(models.City.id, models.City.country_id)).all()
+    return breeds, cities
+
+
+def seed(args):
+    random.seed(args.seed)
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    password_hash = security_utils.hash(BENCH_PASSWORD)
+
+    with SessionLocal() as db:
+        breeds, cities = ensure_reference_data(db)
+        offset = db.scalar(text("SELECT count(*) FROM users"))
+
+        user_ids = insert_rows(db, models.User, [
+            {
+                "name": f"Bench{n}", "surname": "User", "email": BENCH_EMAIL.format(n),
+                "password": password_hash, "profile_picture_url": media_url("avatar", n),
+                "bio": sentence(), "gender": random.choice("MFO"),
+                "private_account": random.random() < 0.2,
+            }
+            for n in range(offset, offset + args.users)
+        ], returning=models.User.id)
+
+        pet_rows = []
+        for user_id in user_ids:
+            for _ in range(random.randint(0, args.pets_per_user * 2)):
+                breed_id, pet_type_id, animal_type_id = random.choice(breeds)
+                city_id, country_id = random.choice(cities)
+                pet_rows.append({
+                    "name": random.choice(WORDS).capitalize(), "nickname": None,
+                    "animal_type_id": animal_type_id, "pet_type_id": pet_type_id,
+                    "breed_1_id": breed_id, "gender": random.choice("MF"),
+                    "profile_picture_url": media_url("pet", len(pet_rows)), "bio": sentence(),
+                    "user_id": user_id, "country_id": country_id, "city_id": city_id,
+                })
+        pet_ids = insert_rows(db, models.Pet, pet_rows, returning=models.Pet.id)
+        pets_by_user = {}
+        for pet_id, row in zip(pet_ids, pet_rows):
+            pets_by_user.setdefault(row["user_id"], []).append(pet_id)
+
+        post_rows = [
+            {
+                "user_id": user_id, "pet_id": random.choice(pet_list), "content": sentence(5, 40),
+                "media_url": media_url("post", i), "media_type": "image/jpeg",
+                "created_at": now - timedelta(minutes=random.randint(0, 60 * 24 * 90)),
+            }
+            for i, (user_id, pet_list) in enumerate(
+                (u, p) for u, p in pets_by_user.items() for _ in range(random.randint(0, args.posts_per_user * 2)))
+        ]
+        post_ids = insert_rows(db, models.Post, post_rows, returning=models.Post.id)
+
+        like_pairs = set()
+        for user_id in user_ids:
+            for post_id in random.sample(post_ids, min(len(post_ids), random.randint(0, args.likes_per_user * 2))):
+                like_pairs.add((user_id, post_id))
+        insert_rows(db, models.Like, [{"user_id": u, "post_id": p} for u, p in like_pairs])
+
+        insert_rows(db, models.Comment, [
+            {"user_id": random.choice(user_ids), "post_id": random.choice(post_ids), "content": sentence()}
+            for _ in range(len(user_ids) * args.comments_per_user)
+        ] if post_ids else [])
+
+        relationship_pairs = set()
+        for user_id in user_ids:
+            for receiver_id in random.sample(user_ids, min(len(user_ids), args.follows_per_user)):
+                if receiver_id != user_id:
+                    relationship_pairs.add((user_id, receiver_id))
+        insert_rows(db, models.UserRelationship, [
+            {"requester_id": r, "receiver_id": v, "status": "accepted" if random.random() < 0.85 else "pending"}
+            for r, v in relationship_pairs
+        ])
+
+        insert_rows(db, models.Story, [
+            {
+                "user_id": user_id, "pet_id": random.choice(pet_list), "media_url": media_url("story", i),
+                "media_type": "image/jpeg", "content": sentence(),
+                "expires_at": now + timedelta(hours=random.randint(-24, 24)),
+            }
+            for i, (user_id, pet_list) in enumerate(pets_by_user.items())
+            if random.random() < args.story_ratio
+        ])
+
+        conversation_pairs = set()
+        for user_id in user_ids:
+            for other in random.sample(user_ids, min(len(user_ids), args.conversations_per_user)):
+                if other != user_id:
+                    conversation_pairs.add(tuple(sorted((user_id, other))))
+        conversation_pairs = list(conversation_pairs)
+        conversation_ids = insert_rows(db, models.Conversation, [
+            {"conversation_type": "direct"} for _ in conversation_pairs
+        ], returning=models.Conversation.id)
+        insert_rows(db, models.Participant, [
+            {"user_id": user_id, "conversation_id": conversation_id, "is_admin": user_id == pair[0]}
+            for conversation_id, pair in zip(conversation_ids, conversation_pairs) for user_id in pair
+        ])
+        insert_rows(db, models.Message, [
+            {"conversation_id": conversation_id, "sender_id": random.choice(pair), "content": sentence(),
+             "created_at": now - timedelta(minutes=random.randint(0, 60 * 24 * 30))}
+            for conversation_id, pair in zip(conversation_ids, conversation_pairs)
+            for _ in range(random.randint(1, args.messages_per_conversation * 2))
+        ])
+
+        # Denormalized counters the API reads instead of counting
+        db.execute(text("""
+            UPDATE posts SET
+                likes_count = (SELECT count(*) FROM likes WHERE likes.post_id = posts.id),
+                comments_count = (SELECT count(*) FROM comments WHERE comments.post_id = posts.id)
+        """))
+        db.execute(text("ANALYZE"))
+        db.commit()
+
+    logger.info(f"Seeded {len(user_ids)} users in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed synthetic data for benchmarks")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--pets-per-user", type=int, default=2, help="average")
+    parser.add_argument("--posts-per-user", type=int, default=5, help="average per pet owner")
+    parser.add_argument("--likes-per-user", type=int, default=20, help="average")
+    parser.add_argument("--comments-per-user", type=int, default=5)
+    parser.add_argument("--follows-per-user", type=int, default=15)
+    parser.add_argument("--story-ratio", type=float, default=0.3, help="share of pet owners with a story")
+    parser.add_argument("--conversations-per-user", type=int, default=3)
+    parser.add_argument("--messages-per-conversation", type=int, default=20, help="average")
+    parser.add_argument("--seed", type=int, default=42)
+    seed(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
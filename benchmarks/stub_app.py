@@ -0,0 +1,15 @@
+"""
+The API with storage and SMTP stubbed out, for benchmarking a real server process:
+
+    uvicorn benchmarks.stub_app:app --workers 4
+"""
+import os
+
+from benchmarks import stubs
+
+stubs.install(
+    storage_latency_ms=float(os.environ.get("BENCH_STORAGE_LATENCY_MS", 0)),
+    smtp_latency_ms=float(os.environ.get("BENCH_SMTP_LATENCY_MS", 0)),
+)
+
+from app.main import app  # noqa: E402
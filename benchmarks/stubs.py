@@ -0,0 +1,25 @@
+"""
+Local stand-ins for blob storage and SMTP so benchmarks run without external services.
+
+Storage uses the local-disk backend with a simulated round trip; SAS generation is
+an HMAC computation on every backend and stays part of what we measure.
+"""
+import os
+import tempfile
+import time
+
+from app.config import settings
+from app.services import email_service
+
+STUB_STORAGE_DIR = os.path.join(tempfile.gettempdir(), "bench-blobs")
+
+
+def install(storage_latency_ms: float = 0, smtp_latency_ms: float = 0):
+    settings.storage_backend = "local"
+    settings.storage_local_path = STUB_STORAGE_DIR
+    settings.storage_latency_ms = storage_latency_ms
+
+    def send_email(subject, body, recipients):
+        time.sleep(smtp_latency_ms / 1000)
+
+    email_service.send_email = send_email
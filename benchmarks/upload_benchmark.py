@@ -0,0 +1,82 @@
+"""
+Compare the single-request blob upload with the concurrent block upload.
+
+Point the storage settings at Azurite (or any test account), e.g.
+
+    azurite-blob --location /tmp/azurite &
+    AZURE_STORAGE_CONNECTION_STRING="UseDevelopmentStorage=true" python -m benchmarks.upload_benchmark --size-mb 64
+
+Each run uploads a file of random bytes from disk, like a spooled multipart upload,
+and reports throughput and peak Python memory for each mode.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from azure.storage.blob import ContentSettings
+
+from app.config import settings
+from app.services import storage_service
+from app.utils.azure_blob_backend import upload_in_blocks
+
+MB = 1024 * 1024
+
+
+async def upload(backend, mode, path, args):
+    blob_client = backend.container().get_blob_client(f"benchmarks/{uuid.uuid4()}.bin")
+    content_settings = ContentSettings(content_type="application/octet-stream")
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(path, "rb") as data:
+        if mode == "single":
+            await blob_client.upload_blob(data, content_settings=content_settings)
+        else:
+            await upload_in_blocks(blob_client, data, content_settings,
+                                   block_size=args.block_size_mb * MB, max_concurrency=args.concurrency)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    await blob_client.delete_blob()
+    return elapsed, peak
+
+
+async def run(args):
+    settings.storage_backend = "azure"
+    await storage_service.start_storage()
+    try:
+        backend = storage_service.get_backend()
+        await backend.create_containers()
+
+        with tempfile.NamedTemporaryFile(delete=False) as tmp:
+            for _ in range(int(args.size_mb)):
+                tmp.write(os.urandom(MB))
+        size = os.path.getsize(tmp.name)
+
+        print(f"{args.size_mb} MB file, blocks of {args.block_size_mb} MB, concurrency {args.concurrency}")
+        print(f"{'mode':<8}{'run':>4}{'seconds':>10}{'MB/s':>10}{'peak MB':>10}")
+        for mode in ("single", "blocks"):
+            for run_index in range(args.repeat):
+                elapsed, peak = await upload(backend, mode, tmp.name, args)
+                print(f"{mode:<8}{run_index + 1:>4}{elapsed:>10.2f}{size / MB / elapsed:>10.1f}{peak / MB:>10.1f}")
+        os.unlink(tmp.name)
+    finally:
+        await storage_service.close_storage()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark blob upload paths")
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--block-size-mb", type=int, default=settings.blob_upload_block_size // MB)
+    parser.add_argument("--concurrency", type=int, default=settings.blob_upload_max_concurrency)
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
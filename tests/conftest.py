@@ -0,0 +1,60 @@
+"""
+Tests that use the `client` or `db` fixtures run the app against the database configured
+in the environment (DATABASE_*), with media kept in memory and background jobs off, and
+are skipped when it is unreachable. Each such module creates and removes its own rows.
+The other tests need no database.
+"""
+import os
+import uuid
+
+# Required settings, so the app imports without a .env; a real environment takes precedence
+for name, value in {"DATABASE_HOSTNAME": "localhost", "DATABASE_PORT": "5432", "DATABASE_PASSWORD": "test",
+                    "DATABASE_NAME": "test", "DATABASE_USERNAME": "test", "SECRET_KEY": "test-secret",
+                    "ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+                    "EMAIL_SENDER": "test@example.com", "EMAIL_PASSWORD": "test"}.items():
+    os.environ.setdefault(name, value)
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("BLOB_GC_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+# Keep the revocation reload out of the queries a test counts
+os.environ.setdefault("TOKEN_REVOCATION_REFRESH_SECONDS", "3600")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import models, oauth2
+from app.database import SessionLocal
+
+
+@pytest.fixture(scope="session")
+def client():
+    try:
+        with SessionLocal() as db:
+            db.execute(text("SELECT 1"))
+    except OperationalError as e:
+        pytest.skip(f"Database not reachable: {e}")
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def db():
+    with SessionLocal() as db:
+        yield db
+
+
+def auth_headers(user: models.User) -> dict:
+    return {"Authorization": f"Bearer {oauth2.create_access_token(data={'user_id': user.id})}"}
+
+
+def make_user(db, name: str) -> models.User:
+    user = models.User(name=name, surname="Test", email=f"{name}-{uuid.uuid4().hex[:8]}@example.com",
+                       password="not-a-real-hash")
+    db.add(user)
+    db.flush()
+    return user
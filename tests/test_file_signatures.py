@@ -0,0 +1,62 @@
+"""
+Upload type detection from leading bytes, and the policy check built on it; no database needed.
+"""
+import pytest
+from fastapi import HTTPException
+
+from app.utils.file_signatures import IMAGE_TYPES, normalize_type, sniff
+from app.utils.upload_guard import UploadPolicy
+
+
+@pytest.mark.parametrize("head, expected", [
+    (b"\xff\xd8\xff\xe0\x00\x10JFIF", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR", "image/png"),
+    (b"GIF89a\x01\x00", "image/gif"),
+    (b"RIFF\x24\x00\x00\x00WEBPVP8 ", "image/webp"),
+    (b"II*\x00\x08\x00", "image/tiff"),
+    (b"\x00\x00\x00\x18ftypheic\x00\x00", "image/heic"),
+    (b"\x00\x00\x00\x1cftypavif\x00\x00", "image/avif"),
+    (b"\x00\x00\x00\x18ftypmp42\x00\x00", "video/mp4"),
+    (b"\x00\x00\x00\x14ftypqt  \x00\x00", "video/quicktime"),
+    (b"\x1a\x45\xdf\xa3\x9f\x42\x86\x81", "video/webm"),
+    (b"%PDF-1.7\n", "application/pdf"),
+    (b"<html><script>", None),
+    (b"MZ\x90\x00", None),
+    (b"RIFF\x24\x00\x00\x00WAVEfmt ", None),
+    (b"", None),
+])
+def test_sniff(head, expected):
+    assert sniff(head) == expected
+
+
+@pytest.mark.parametrize("declared, expected", [
+    ("image/jpeg", "image/jpeg"),
+    ("Image/JPG; charset=binary", "image/jpeg"),
+    ("image/heif", "image/heic"),
+    ("", None),
+    (None, None),
+])
+def test_normalize_type(declared, expected):
+    assert normalize_type(declared) == expected
+
+
+JPEG = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00"
+POLICY = UploadPolicy("test", 1024, IMAGE_TYPES)
+
+
+@pytest.mark.parametrize("declared", [None, "image/jpeg", "image/jpg", "application/octet-stream"])
+def test_check_type_accepts_matching_or_undeclared_type(declared):
+    POLICY.check_type(JPEG, declared)
+
+
+@pytest.mark.parametrize("head, declared", [
+    (b"<html><script>", None),
+    (b"%PDF-1.7\n", "application/pdf"),
+    # Image bytes that would be stored and served as the declared type
+    (JPEG, "text/html"),
+    (JPEG, "image/png"),
+])
+def test_check_type_rejects(head, declared):
+    with pytest.raises(HTTPException) as raised:
+        POLICY.check_type(head, declared)
+    assert raised.value.status_code == 415
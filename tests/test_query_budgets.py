@@ -0,0 +1,127 @@
+"""
+Query budgets for endpoints that were optimized for their query count: eager loads
+instead of per-row lazy loads, and the claims-only auth dependency. A change that
+reintroduces an N+1 or a user lookup fails here.
+"""
+import pytest
+from sqlalchemy import delete
+
+from app import models
+from app.utils.query_counter import assert_max_queries
+
+from .conftest import auth_headers, make_user
+
+POSTS = 6
+FOLLOWERS = 4
+CONVERSATIONS = 3
+
+
+@pytest.fixture(scope="module")
+def world(client, db):
+    """
+    A user with a pet and posts, followed by and talking with a few other users.
+    """
+    animal_type = models.AnimalType(name="Test mammal")
+    db.add(animal_type)
+    db.flush()
+    pet_type = models.PetType(name="Test dog", animal_type_id=animal_type.id)
+    db.add(pet_type)
+    db.flush()
+    breed = models.Breed(name="Test beagle", pet_type_id=pet_type.id)
+    db.add(breed)
+    db.flush()
+
+    owner = make_user(db, "owner")
+    others = [make_user(db, f"friend{i}") for i in range(FOLLOWERS)]
+    pet = models.Pet(name="Rex", animal_type_id=animal_type.id, pet_type_id=pet_type.id,
+                     breed_1_id=breed.id, user_id=owner.id)
+    db.add(pet)
+    db.flush()
+
+    posts = [models.Post(user_id=owner.id, pet_id=pet.id, content=f"post {i}",
+                         media_url=f"http://localhost:8000/storage/private/user-data/test-{i}.jpg")
+             for i in range(POSTS)]
+    db.add_all(posts)
+    for other in others:
+        db.add(models.UserRelationship(requester_id=other.id, receiver_id=owner.id, status="accepted"))
+        db.add(models.Story(user_id=other.id, pet_id=pet.id,
+                            media_url="http://localhost:8000/storage/private/user-data/story.jpg"))
+
+    conversations = []
+    for other in others[:CONVERSATIONS]:
+        conversation = models.Conversation()
+        db.add(conversation)
+        db.flush()
+        db.add_all([models.Participant(user_id=owner.id, conversation_id=conversation.id),
+                    models.Participant(user_id=other.id, conversation_id=conversation.id)])
+        db.add_all([models.Message(conversation_id=conversation.id, sender_id=sender.id, content=f"hi {n}")
+                    for n, sender in enumerate([owner, other, owner])])
+        conversations.append(conversation)
+    db.commit()
+
+    yield {"owner": owner, "others": others, "pet": pet, "posts": posts}
+
+    # Core deletes, so the database's ON DELETE CASCADE removes the dependent rows
+    db.rollback()
+    db.execute(delete(models.Conversation).where(models.Conversation.id.in_([c.id for c in conversations])))
+    db.execute(delete(models.User).where(models.User.id.in_([user.id for user in [owner, *others]])))
+    db.execute(delete(models.Breed).where(models.Breed.id == breed.id))
+    db.execute(delete(models.PetType).where(models.PetType.id == pet_type.id))
+    db.execute(delete(models.AnimalType).where(models.AnimalType.id == animal_type.id))
+    db.commit()
+
+
+def _count(client, method: str, path: str, headers: dict, budget: int, **kwargs):
+    with assert_max_queries(budget, f"{method} {path}") as stats:
+        response = client.request(method, path, headers=headers, **kwargs)
+    assert response.status_code < 400, response.text
+    return response, stats
+
+
+def test_get_posts_does_not_grow_with_page_size(client, world):
+    headers = auth_headers(world["owner"])
+    path = f"/posts/?user_id={world['owner'].id}"
+
+    one, one_stats = _count(client, "GET", f"{path}&limit=1", headers, 3)
+    page, page_stats = _count(client, "GET", f"{path}&limit={POSTS}", headers, 3)
+
+    assert len(page.json()) == POSTS
+    assert page_stats.count == one_stats.count
+
+
+def test_get_post(client, world):
+    _count(client, "GET", f"/posts/{world['posts'][0].id}", auth_headers(world["owner"]), 3)
+
+
+def test_get_notifications(client, world):
+    _count(client, "GET", "/notifications/", auth_headers(world["owner"]), 1)
+
+
+def test_like_does_not_load_the_user(client, world):
+    headers = auth_headers(world["others"][0])
+    post_id = world["posts"][0].id
+
+    for direction in (1, 0):
+        _, stats = _count(client, "POST", "/like/", headers, 4, json={"post_id": post_id, "dir": direction})
+        assert not any("FROM users" in statement for statement in stats.fingerprints), stats.report()
+
+
+def test_comment(client, world):
+    # Insert, refresh, and the commenter CommentResponse embeds; none for auth
+    _count(client, "POST", "/comment/", auth_headers(world["others"][1]), 3,
+           json={"post_id": world["posts"][1].id, "content": "nice"})
+
+
+def test_get_conversations(client, world):
+    response, _ = _count(client, "GET", "/messaging/conversations", auth_headers(world["owner"]), 4)
+
+    conversations = response.json()
+    assert len(conversations) == CONVERSATIONS
+    assert all(conversation["last_message"]["content"] == "hi 2" for conversation in conversations)
+
+
+def test_get_followers(client, world):
+    response, _ = _count(client, "GET", f"/follows/followers/{world['owner'].id}", auth_headers(world["owner"]), 3)
+
+    assert len(response.json()) == FOLLOWERS
+    assert all(len(follower["stories"]) == 1 for follower in response.json())
@@ -0,0 +1,82 @@
+"""
+Token-bucket math and client address resolution; no database needed.
+"""
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from app.config import settings
+from app.services.rate_limit_service import client_ip
+from app.utils.rate_limiter import MemoryBackend
+
+
+def _request(forwarded_for=None, client="10.0.0.1"):
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "client": (client, 50000)})
+
+
+def test_take_all_debits_every_bucket_when_all_allow():
+    backend = MemoryBackend()
+    waits = asyncio.run(backend.take_all([("a", 2, 1), ("b", 2, 1)]))
+
+    assert waits == [0.0, 0.0]
+    assert backend._buckets["a"][0] == pytest.approx(1)
+    assert backend._buckets["b"][0] == pytest.approx(1)
+
+
+def test_take_all_does_not_debit_on_partial_deny():
+    backend = MemoryBackend()
+    asyncio.run(backend.take("narrow", 1, 0.001))
+
+    waits = asyncio.run(backend.take_all([("wide", 5, 1), ("narrow", 1, 0.001)]))
+
+    assert waits[0] == 0
+    assert waits[1] > 0
+    # The bucket that allowed it keeps its tokens: a rejected request costs nothing
+    assert backend._buckets["wide"][0] == pytest.approx(5)
+    assert backend._buckets["narrow"][0] == pytest.approx(0, abs=0.01)
+
+
+def test_take_refills_over_time(monkeypatch):
+    backend = MemoryBackend()
+    now = [1000.0]
+    monkeypatch.setattr("app.utils.rate_limiter.time.monotonic", lambda: now[0])
+
+    assert asyncio.run(backend.take("k", 1, 0.5)) == 0
+    assert asyncio.run(backend.take("k", 1, 0.5)) == pytest.approx(2)
+    now[0] += 2
+    assert asyncio.run(backend.take("k", 1, 0.5)) == 0
+
+
+def test_memory_backend_drops_least_recently_used_keys():
+    backend = MemoryBackend(max_keys=2)
+    for key in ("a", "b", "c"):
+        asyncio.run(backend.take(key, 1, 1))
+
+    assert list(backend._buckets) == ["b", "c"]
+
+
+def test_client_ip_ignores_forwarded_for_when_untrusted(monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_trust_forwarded_for", False)
+
+    assert client_ip(_request("203.0.113.7")) == "10.0.0.1"
+
+
+@pytest.mark.parametrize("forwarded_for, hops, expected", [
+    # App Service appends the caller's address with its port
+    ("203.0.113.7:51234", 1, "203.0.113.7"),
+    # Entries left of the proxy's own come from the client and are ignored
+    ("1.1.1.1, 203.0.113.7:51234", 1, "203.0.113.7"),
+    ("[2001:db8::1]:51234", 1, "2001:db8::1"),
+    ("2001:db8::1", 1, "2001:db8::1"),
+    ("1.1.1.1, 203.0.113.7, 10.0.0.9", 2, "203.0.113.7"),
+    # Fewer entries than trusted proxies: the header didn't pass through all of them
+    ("203.0.113.7", 2, "10.0.0.1"),
+    (None, 1, "10.0.0.1"),
+])
+def test_client_ip_uses_entry_appended_by_trusted_proxy(monkeypatch, forwarded_for, hops, expected):
+    monkeypatch.setattr(settings, "rate_limit_trust_forwarded_for", True)
+    monkeypatch.setattr(settings, "rate_limit_forwarded_for_hops", hops)
+
+    assert client_ip(_request(forwarded_for)) == expected
@@ -0,0 +1,67 @@
+"""
+Rotation of the cached read SAS; no database needed.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.config import settings
+from app.services import storage_service
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def signer(monkeypatch):
+    """
+    Controls the clock seen by get_read_sas and records every SAS it signs.
+    """
+    now = [START]
+    signed = []
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now[0]
+
+    def create_read_sas(expiry):
+        signed.append(expiry)
+        return f"sas-{len(signed)}"
+
+    monkeypatch.setattr(storage_service, "datetime", Clock)
+    monkeypatch.setattr(storage_service, "create_read_sas", create_read_sas)
+    monkeypatch.setattr(storage_service, "_cached_sas", None)
+    monkeypatch.setattr(settings, "sas_token_lifetime_minutes", 1440)
+    monkeypatch.setattr(settings, "sas_token_rotation_margin_minutes", 60)
+    return now, signed
+
+
+def test_read_sas_is_reused_until_the_rotation_margin(signer):
+    now, signed = signer
+
+    assert storage_service.get_read_sas() == "sas-1"
+    now[0] = START + timedelta(minutes=1440 - 61)
+    assert storage_service.get_read_sas() == "sas-1"
+    assert signed == [START + timedelta(minutes=1440)]
+
+
+def test_read_sas_rotates_within_the_margin(signer):
+    now, signed = signer
+    storage_service.get_read_sas()
+
+    now[0] = START + timedelta(minutes=1440 - 60)
+    assert storage_service.get_read_sas() == "sas-2"
+    # The new token is good for a full lifetime from now
+    assert signed[-1] == now[0] + timedelta(minutes=1440)
+    assert storage_service.get_read_sas() == "sas-2"
+
+
+def test_rotation_margin_is_capped_at_half_the_lifetime(signer, monkeypatch):
+    now, signed = signer
+    monkeypatch.setattr(settings, "sas_token_rotation_margin_minutes", 1440)
+    storage_service.get_read_sas()
+
+    now[0] = START + timedelta(minutes=719)
+    assert storage_service.get_read_sas() == "sas-1"
+    now[0] = START + timedelta(minutes=720)
+    assert storage_service.get_read_sas() == "sas-2"
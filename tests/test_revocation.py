@@ -0,0 +1,126 @@
+"""
+In-memory state behind token checks: the revocation filter, the user row cache
+and the claims-only Principal; no database needed.
+"""
+import pytest
+
+from app import oauth2
+from app.utils.cache_utils import TTLCache
+from app.utils.revocation_filter import RevocationFilter
+
+
+def test_revocation_filter_add():
+    revoked = RevocationFilter()
+    revoked.add("a", expires_at=2000)
+
+    assert revoked.is_revoked("a")
+    assert not revoked.is_revoked("b")
+    assert not revoked.is_revoked(None)
+
+
+def test_revocation_filter_replace_drops_stale_entries_but_keeps_local_adds():
+    revoked = RevocationFilter()
+    revoked.replace([("old", 2000)])
+    # Revoked by this worker while a full load was running: not in its rows yet
+    revoked.add("local", 2000)
+
+    revoked.replace([("new", 2000)])
+
+    assert revoked.loaded
+    assert not revoked.is_revoked("old")
+    assert revoked.is_revoked("new")
+    assert revoked.is_revoked("local")
+    assert len(revoked) == 2
+
+
+def test_revocation_filter_update_merges():
+    revoked = RevocationFilter()
+    revoked.replace([("a", 2000)])
+
+    revoked.update([("b", 2000)])
+
+    assert revoked.is_revoked("a")
+    assert revoked.is_revoked("b")
+
+
+def test_revocation_filter_prune_drops_expired_tokens():
+    revoked = RevocationFilter()
+    revoked.replace([("expired", 1000), ("live", 3000)])
+    revoked.add("expired-local", 1500)
+
+    assert revoked.prune(now=2000) == 2
+
+    assert not revoked.is_revoked("expired")
+    assert not revoked.is_revoked("expired-local")
+    assert revoked.is_revoked("live")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.utils.cache_utils.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set(1, "one")
+    cache.set(2, "two")
+    cache.get(1)
+
+    cache.set(3, "three")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "one"
+    assert cache.get(3) == "three"
+    assert len(cache) == 2
+
+
+def test_ttl_cache_expires_entries(clock):
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set(1, "one")
+
+    clock[0] += 59
+    assert cache.get(1) == "one"
+    clock[0] += 1
+    assert cache.get(1) is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_invalidate_and_disabled(clock):
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set(1, "one")
+    cache.invalidate(1)
+    assert cache.get(1) is None
+
+    disabled = TTLCache(maxsize=0, ttl=60)
+    disabled.set(1, "one")
+    assert disabled.get(1) is None
+
+
+def test_principal_loads_the_user_only_when_needed(monkeypatch):
+    loads = []
+
+    class User:
+        name = "Rex"
+
+    def load_user(db, user_id):
+        loads.append(user_id)
+        return User()
+
+    monkeypatch.setattr(oauth2, "load_user", load_user)
+    principal = oauth2.Principal(7, db=None)
+
+    assert principal.id == 7
+    assert loads == []
+    assert principal.name == "Rex"
+    assert principal.name == "Rex"
+    assert loads == [7]
+
+
+def test_principal_of_deleted_user_is_unauthorized(monkeypatch):
+    monkeypatch.setattr(oauth2, "load_user", lambda db, user_id: None)
+
+    with pytest.raises(oauth2.HTTPException) as raised:
+        oauth2.Principal(7, db=None).name
+    assert raised.value.status_code == 401